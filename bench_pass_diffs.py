@@ -0,0 +1,62 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from compilerSupport import find_ordered_passes, generate_pass_diffs
+
+
+def write_synthetic_dumps(directory, passes, lines, seed=0):
+    # GIMPLE-like dumps where each pass rewrites a few percent of the previous one
+    rng = random.Random(seed)
+    body = [f"  _{i} = _{rng.randrange(lines)} + {rng.randrange(100)};\n" for i in range(lines)]
+    for num in range(passes):
+        for _ in range(max(1, lines // 50)):
+            i = rng.randrange(len(body))
+            if rng.random() < 0.5:
+                body[i] = f"  _{i} = _{rng.randrange(lines)} * {rng.randrange(100)};\n"
+            else:
+                body.insert(i, f"  # DEBUG pass {num} line {i}\n")
+        with open(os.path.join(directory, f"bench.c.{num:03d}t.pass{num}"), "w") as f:
+            f.write(f";; Function main (pass {num})\n\n")
+            f.writelines(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs. process-pool pass diff computation")
+    parser.add_argument("--dump-dir", help="Existing build dir with -fdump-tree-all dumps (default: synthetic)")
+    parser.add_argument("--passes", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=5000, help="Lines per synthetic dump")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump_dir = args.dump_dir
+        if dump_dir is None:
+            dump_dir = tmp
+            write_synthetic_dumps(dump_dir, args.passes, args.lines)
+
+        diffs = generate_pass_diffs(find_ordered_passes(dump_dir, "t"))
+        print(f"{len(diffs) + 1} passes, {len(diffs)} pass pairs")
+        # Fingerprinting reads every dump into this process's store; done up
+        # front so neither timed run pays for it
+        diffs.set_unchanged(diffs.find_unchanged())
+
+        start = time.perf_counter()
+        serial = diffs.all_diffs(max_workers=1)
+        serial_time = time.perf_counter() - start
+        print(f"serial:             {serial_time:8.2f}s")
+
+        start = time.perf_counter()
+        parallel = diffs.all_diffs(max_workers=args.workers)
+        parallel_time = time.perf_counter() - start
+        print(f"{args.workers:2d} worker processes: {parallel_time:8.2f}s  ({serial_time / parallel_time:.1f}x)")
+
+        if parallel != serial:
+            raise SystemExit("parallel diffs differ from the serial ones")
+        print("results identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import difflib
+import random
+from array import array
+
+from compilerSupport import DumpStore, find_ordered_passes, split_dump_sections
+
+
+def random_pair(rng):
+    # Two short line lists over a small alphabet, so they share many lines and
+    # the matcher sees repeats, junk-free runs and edits at both ends
+    alphabet = [f"line {c}\n" for c in "abcdefgh"[:rng.randint(1, 8)]]
+    lines1 = [rng.choice(alphabet) for _ in range(rng.randint(0, 60))]
+    lines2 = list(lines1)
+    for _ in range(rng.randint(0, 8)):
+        i = rng.randint(0, len(lines2))
+        if lines2 and rng.random() < 0.5:
+            del lines2[min(i, len(lines2) - 1)]
+        else:
+            lines2.insert(i, rng.choice(alphabet))
+    return lines1, lines2
+
+
+def difflib_diff(lines1, lines2):
+    return list(difflib.unified_diff(lines1, lines2, "", "", lineterm=""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check DumpStore.unified_diff against difflib.unified_diff")
+    parser.add_argument("--dump-dir", help="Build dir with -fdump-tree-all dumps to check function by function")
+    parser.add_argument("--sequences", type=int, default=3000, help="Random line sequences to check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = DumpStore()
+    rng = random.Random(args.seed)
+    for n in range(args.sequences):
+        lines1, lines2 = random_pair(rng)
+        ids1, ids2 = array("i", map(store.intern, lines1)), array("i", map(store.intern, lines2))
+        if store.unified_diff(ids1, ids2) != difflib_diff(lines1, lines2):
+            raise SystemExit(f"random sequence {n} differs from difflib")
+    print(f"{args.sequences} random sequences identical")
+
+    if args.dump_dir:
+        passes = find_ordered_passes(args.dump_dir, "t")
+        checked = 0
+        for (_, _, path1), (_, _, path2) in zip(passes, passes[1:]):
+            with open(path1) as f1, open(path2) as f2:
+                sections1, sections2 = split_dump_sections(f1), split_dump_sections(f2)
+            for name in sections2:
+                if name is None or name not in sections1:
+                    continue
+                # load() leaves out the ";; Function" header line
+                if store.diff(path1, path2, name) != difflib_diff(sections1[name][1:], sections2[name][1:]):
+                    raise SystemExit(f"{path1} → {path2}, {name}: differs from difflib")
+                checked += 1
+        print(f"{checked} functions of {len(passes)} dumps identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,24 @@ import subprocess
 from PyQt5.QtWidgets import (
    QApplication, QMainWindow, QAction, QFileDialog, 
    QTextEdit, QMessageBox, QLabel, QListWidget, 
-   QSplitter, QGraphicsView, QGraphicsScene, QDialog, QVBoxLayout
+   QSplitter, QGraphicsView, QGraphicsScene, QDialog, QVBoxLayout,
+   QProgressBar, QPushButton, QListWidgetItem, QDialogButtonBox, QHBoxLayout,
+   QTableWidget, QTableWidgetItem, QTreeWidget, QTreeWidgetItem, QComboBox, QLineEdit, QCheckBox,
+   QListView, QPlainTextEdit, QStackedWidget, QPlainTextDocumentLayout
 )
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QPixmap
-from PyQt5.QtCore import Qt, QUrl
-import os, glob, tempfile, difflib
+from PyQt5.QtGui import (
+   QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QPixmap, QPen, QBrush, QFontMetrics, QKeySequence,
+   QTextDocument
+)
+from PyQt5.QtCore import (
+   Qt, QUrl, QObject, QThread, QTimer, QElapsedTimer, pyqtSignal, QAbstractListModel, QModelIndex, QSize
+)
+import os, glob, tempfile, difflib, signal, threading, hashlib, shutil, time, uuid
+import concurrent.futures, json, shlex, gzip, bisect
+from array import array
+from html import escape as html_escape
+from collections import deque, OrderedDict
 
 def parse_cfg_to_dot(cfg_text):
     dot_lines = ["digraph CFG {", "node [shape=box, fontname=\"Courier\"];"]
@@ -77,23 +89,29 @@ def parse_cfg_to_dot(cfg_text):
     dot_lines.append("}")
     return "\n".join(dot_lines)
 
-def extract_cfgs_per_function(cfg_text):
-    functions = {}
-    current_func = None
-    current_lines = []
-
-    for line in cfg_text.splitlines():
+def split_dump_sections(lines):
+    # OrderedDict(function -> its lines, ";; Function" header first) over the
+    # lines of a dump, with any text before the first header under None. Names
+    # are gcc's own ("g.constprop", "f.part.0"); a second body of the same name
+    # gets a "'" appended. Every per-function view of a dump goes through here.
+    sections = OrderedDict()
+    current = sections[None] = []
+    for line in lines:
         if line.startswith(";; Function "):
-            if current_func and current_lines:
-                functions[current_func] = "\n".join(current_lines)
-            current_func = re.findall(r";; Function (\w+)", line)[0]
-            current_lines = []
-        elif current_func is not None:
-            current_lines.append(line)
-
-    if current_func and current_lines:
-        functions[current_func] = "\n".join(current_lines)
+            name = line.split()[2]
+            while name in sections:
+                name += "'"
+            current = sections[name] = []
+        current.append(line)
+    if not sections[None]:
+        del sections[None]
+    return sections
 
+def extract_cfgs_per_function(cfg_text):
+    functions = {}
+    for name, lines in split_dump_sections(cfg_text.splitlines()).items():
+        if name is not None and len(lines) > 1:
+            functions[name] = "\n".join(lines[1:])
     return functions
 
 from PyQt5.QtWidgets import QTabWidget
@@ -109,10 +127,22 @@ class TabbedCFGWindow(QDialog):
         layout.addWidget(self.tabs)
         self.setLayout(layout)
 
+        self.set_cfgs(per_func_cfgs)
+
+    def set_cfgs(self, per_func_cfgs):
+        # Rebuilds the tabs in place, keeping the function the user was looking at
+        current = self.tabs.tabText(self.tabs.currentIndex()) if self.tabs.count() else None
+        while self.tabs.count():
+            tab = self.tabs.widget(0)
+            self.tabs.removeTab(0)
+            tab.deleteLater()
+
         for func_name, cfg_text in per_func_cfgs.items():
             dot = parse_cfg_to_dot(cfg_text)
             tab = self.create_webview_tab(dot)
             self.tabs.addTab(tab, func_name)
+            if func_name == current:
+                self.tabs.setCurrentIndex(self.tabs.count() - 1)
 
     def create_webview_tab(self, dot_source):
         view = QWebEngineView()
@@ -139,9 +169,25 @@ class TabbedCFGWindow(QDialog):
         return view
 
 
+def dump_pass_name(path):
+    match = re.search(r"\.\d+[tir]\.([^.]+)$", path)
+    return match.group(1) if match else None
+
+def remark_sections(diff, remarks, pass_name):
+    # The diff itself, then the remarks the later pass emitted, grouped by the
+    # optgroup gcc assigns to that pass
+    sections = {"All": diff}
+    if remarks is None or pass_name is None:
+        return sections
+    for remark in remarks.filter(**{"pass": pass_name}):
+        sections.setdefault(remark["category"], []).append(format_remark(remark))
+    return sections
+
 class GimpleDiffViewer(QDialog):
-    def __init__(self, file_a, file_b, parent=None):
+    def __init__(self, file_a, file_b, parent=None, remarks=None):
         super().__init__(parent)
+        self.remarks = remarks
+        self.pass_name = dump_pass_name(file_b)
         self.setWindowTitle(f"GIMPLE Diff Viewer: {os.path.basename(file_a)} vs {os.path.basename(file_b)}")
         self.resize(1000, 600)
 
@@ -157,13 +203,11 @@ class GimpleDiffViewer(QDialog):
         self.sidebar.addItems(self.sections.keys())
         self.sidebar.currentTextChanged.connect(self.show_section)
 
-        self.text_view = QTextEdit()
-        self.text_view.setReadOnly(True)
-        self.text_view.setFont(QFont("Courier", 10))
+        self.diff_view = DiffView()
 
         splitter = QSplitter()
         splitter.addWidget(self.sidebar)
-        splitter.addWidget(self.text_view)
+        splitter.addWidget(self.diff_view)
         splitter.setStretchFactor(1, 2)
 
         layout = QVBoxLayout()
@@ -174,41 +218,10 @@ class GimpleDiffViewer(QDialog):
         self.sidebar.setCurrentRow(0)
 
     def segment_diff(self, diff):
-        sections = {"All": diff}
-        curr_section = "Misc"
-        section_lines = []
-
-        keyword_map = {
-            "Dead Code": ["eliminate", "unused", "dce"],
-            "Inlining": ["inline"],
-            "Constant Folding": ["fold", "constant"],
-            "Loop Optimizations": ["loop", "unroll", "ivopt"],
-            "Strength Reduction": ["strength", "reduction"],
-            "Reordering": ["reorder", "schedule"],
-        }
-
-        for line in diff:
-            matched = False
-            for section, keywords in keyword_map.items():
-                if any(kw in line.lower() for kw in keywords):
-                    sections.setdefault(section, []).append(line)
-                    matched = True
-            if not matched:
-                sections.setdefault("Misc", []).append(line)
-        return sections
+        return remark_sections(diff, self.remarks, self.pass_name)
 
     def show_section(self, section_name):
-        lines = self.sections.get(section_name, [])
-        colored = []
-        for line in lines:
-            if line.startswith("+") and not line.startswith("+++"):
-                colored.append(f'<span style="color:green;">{line}</span>')
-            elif line.startswith("-") and not line.startswith("---"):
-                colored.append(f'<span style="color:red;">{line}</span>')
-            else:
-                colored.append(f'<span>{line}</span>')
-        html = "<pre>" + "\n".join(colored) + "</pre>"
-        self.text_view.setHtml(html)
+        self.diff_view.set_diff(self.sections.get(section_name, []))
 
 class CFGWindow(QDialog):
     def __init__(self, dot_source, parent=None):
@@ -345,8 +358,10 @@ class OptimizationViewer(QDialog):
         self.setLayout(layout)
 
 class RtlDiffViewer(QDialog):
-    def __init__(self, file_a, file_b, parent=None):
+    def __init__(self, file_a, file_b, parent=None, remarks=None):
         super().__init__(parent)
+        self.remarks = remarks
+        self.pass_name = dump_pass_name(file_b)
         self.setWindowTitle(f"RTL Diff: {os.path.basename(file_a)} vs {os.path.basename(file_b)}")
         self.resize(1000, 600)
 
@@ -360,12 +375,10 @@ class RtlDiffViewer(QDialog):
         self.sidebar.addItems(self.sections.keys())
         self.sidebar.currentTextChanged.connect(self.show_section)
 
-        self.text_view = QTextEdit()
-        self.text_view.setReadOnly(True)
-        self.text_view.setFont(QFont("Courier", 10))
+        self.diff_view = DiffView()
 
         splitter = QSplitter()
-        splitter.addWidget(self.sidebar); splitter.addWidget(self.text_view)
+        splitter.addWidget(self.sidebar); splitter.addWidget(self.diff_view)
         splitter.setStretchFactor(1, 2)
 
         layout = QVBoxLayout()
@@ -375,131 +388,2738 @@ class RtlDiffViewer(QDialog):
         self.sidebar.setCurrentRow(0)
 
     def segment_rtl(self, diff):
-        mapping = {
-            "Instr Combine": ["combine", "peephole"],
-            "Reg Allocation": ["reg", "reload"],
-            "Branch Align": ["align"],
-        }
-        secs = {"All": diff}
-        for line in diff:
-            for sec, kw in mapping.items():
-                if any(w in line.lower() for w in kw):
-                    secs.setdefault(sec, []).append(line)
-        secs["Misc"] = [l for l in diff if all(l not in v for v in secs.values())]
-        return secs
+        return remark_sections(diff, self.remarks, self.pass_name)
 
     def show_section(self, sec):
-        html = "<pre>"
-        for line in self.sections.get(sec, []):
-            c = "green" if line.startswith("+") and not line.startswith("+++") else \
-                "red" if line.startswith("-") and not line.startswith("---") else "black"
-            html += f'<span style="color:{c};">{line}</span>\n'
-        html += "</pre>"
-        self.text_view.setHtml(html)
+        self.diff_view.set_diff(self.sections.get(sec, []))
+
+SSA_VERSION_RE = re.compile(r"_\d+\b")  # "x_12", "_7", "n_5(D)"
+TEMP_DECL_RE = re.compile(r"\b([DL])\.\d+\b")
+BLOCK_RE = re.compile(r"(<bb |\[bb |basic block )(\d+)")
+INSN_HEADER_RE = re.compile(
+    r"^(\s*\((?:insn|jump_insn|call_insn|debug_insn|code_label|note|barrier|jump_table_data)(?:/\w)*(?::\w+)?) (\d+) (\d+) (\d+)( \d+)?")
+INSN_REF_RE = re.compile(r"(\(label_ref(?::\w+)? |\(insn_list:\w+ )(\d+)")
+PHI_EDGE_RE = re.compile(r"(?<=[\w)])\((\d+)\)")  # "s_8(3)": the value flowing in from bb 3
+
+def canonicalize_lines(lines):
+    # Blanks out what passes renumber for their own bookkeeping (SSA versions,
+    # D.NNNN temporaries, basic block indices, RTL insn UIDs) so two passes
+    # compare equal wherever only the numbering moved. Renumbering in order of
+    # appearance would not do: one new SSA name early on shifts every later one.
+    canonical = []
+    for line in lines:
+        # The substring tests skip the regexes on lines that cannot match
+        if "(" in line:
+            line = INSN_HEADER_RE.sub(lambda m: m.group(1) + " # # #" + (" #" if m.group(5) else ""), line)
+            line = INSN_REF_RE.sub(lambda m: m.group(1) + "#", line)
+        if "bb " in line or "block " in line:
+            line = BLOCK_RE.sub(lambda m: m.group(1) + "#", line)
+        if "= PHI <" in line:
+            line = PHI_EDGE_RE.sub("(#)", line)
+        if "D." in line or "L." in line:
+            line = TEMP_DECL_RE.sub(lambda m: m.group(1) + ".#", line)
+        if "_" in line:
+            line = SSA_VERSION_RE.sub("_#", line)
+        canonical.append(line)
+    return canonical
+
+class DumpStore:
+    # Every dump is read once and stored as an array of line ids into one pool
+    # of distinct lines. Consecutive passes share almost all of their lines, so
+    # the pool stays small, and comparing two lines is comparing two ints.
+    def __init__(self):
+        self.line_ids = {}
+        self.lines = []
+        self.dumps = {}  # (path, func_name, canonical) -> array of line ids
+        self.sections = {}  # (path, canonical) -> OrderedDict(function or None for the preamble -> line ids)
+        self.digests = {}  # (path, func_name or None for the whole dump) -> content hash
+        self.insns = {}  # (path, func_name) -> parse_rtl_insns() records
+        # Pass comparisons load dumps from a worker thread while the timeline
+        # loads from the GUI thread; interning must not hand one line two ids
+        self.lock = threading.RLock()
+
+    def intern(self, line):
+        line_id = self.line_ids.get(line)
+        if line_id is None:
+            line_id = self.line_ids[line] = len(self.lines)
+            self.lines.append(line)
+        return line_id
+
+    def load(self, path, func_name=None, canonical=False):
+        # None is the empty dump; func_name keeps only that function's body;
+        # canonical applies canonicalize_lines first
+        if path is None:
+            return array("i")
+        key = (path, func_name, canonical)
+        ids = self.dumps.get(key)
+        if ids is None:
+            with self.lock:
+                return self.load_locked(path, func_name, canonical)
+        return ids
+
+    def load_locked(self, path, func_name, canonical):
+        key = (path, func_name, canonical)
+        ids = self.dumps.get(key)
+        if ids is None:
+            if func_name is None:
+                ids = array("i")
+                for section in self.load_sections(path, canonical).values():
+                    ids.extend(section)
+            else:
+                # The function's section without its ";; Function" header
+                ids = self.load_sections(path, canonical).get(func_name, array("i"))[1:]
+            self.dumps[key] = ids
+        return ids
+
+    def load_sections(self, path, canonical=False):
+        # Splits a dump at its ";; Function" headers (header line included), keeping
+        # any text before the first one under None; together they are the whole file
+        if path is None:
+            return OrderedDict()
+        sections = self.sections.get((path, canonical))
+        if sections is not None:
+            return sections
+        with self.lock:
+            return self.load_sections_locked(path, canonical)
+
+    def load_sections_locked(self, path, canonical):
+        sections = self.sections.get((path, canonical))
+        if sections is None:
+            if canonical:
+                # Canonicalizes the lines already interned for the raw sections
+                # rather than reading the file again
+                lines = self.lines
+                sections = OrderedDict(
+                    (name, array("i", map(self.intern, canonicalize_lines([lines[k] for k in ids]))))
+                    for name, ids in self.load_sections_locked(path, False).items())
+            else:
+                # Hashed as it is interned, so fingerprints never read a dump again
+                sections = OrderedDict()
+                whole = hashlib.blake2b(digest_size=16)
+                with open(path) as f:
+                    for name, lines in split_dump_sections(f).items():
+                        text = "".join(lines).encode("utf-8", "surrogateescape")
+                        whole.update(text)
+                        if name is not None:
+                            # The body without its header line, as load() returns it
+                            body = "".join(lines[1:]).encode("utf-8", "surrogateescape")
+                            self.digests[(path, name)] = hashlib.blake2b(body, digest_size=16).digest()
+                        sections[name] = array("i", map(self.intern, lines))
+                self.digests[(path, None)] = whole.digest()
+            self.sections[(path, canonical)] = sections
+        return sections
+
+    def fingerprint(self, path, func_name=None):
+        # Content hash of the whole dump (func_name None) or of one function's
+        # body, taken when the dump is loaded: telling unchanged passes apart
+        # costs no diffing, and the read serves the diffs that follow
+        if path is None:
+            return b""
+        digest = self.digests.get((path, func_name))
+        if digest is None:
+            self.load_sections(path)
+            digest = self.digests.get((path, func_name), b"")
+        return digest
+
+    def unified_diff(self, ids1, ids2, n=3, name="", shown1=None, shown2=None):
+        # Same output as difflib.unified_diff(lines1, lines2, name, name, lineterm=""),
+        # but the matching runs on the id arrays and text is looked up only for the
+        # hunks. shown1/shown2 (same lengths) are printed instead of ids1/ids2, so
+        # lines can be matched in canonical form and shown as gcc wrote them.
+        if ids1 == ids2:
+            return []
+        if shown1 is None:
+            shown1, shown2 = ids1, ids2
+        lines = self.lines
+        diff = []
+        for group in difflib.SequenceMatcher(None, ids1, ids2).get_grouped_opcodes(n):
+            if not diff:
+                diff += [f"--- {name}", f"+++ {name}"]
+            first, last = group[0], group[-1]
+            diff.append(f"@@ -{unified_range(first[1], last[2])} +{unified_range(first[3], last[4])} @@")
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    diff.extend(" " + lines[k] for k in shown1[i1:i2])
+                    continue
+                if tag in ("replace", "delete"):
+                    diff.extend("-" + lines[k] for k in shown1[i1:i2])
+                if tag in ("replace", "insert"):
+                    diff.extend("+" + lines[k] for k in shown2[j1:j2])
+        return diff
+
+    def diff(self, path1, path2, func_name=None, canonical=False, mode="lines"):
+        # canonical matches lines after canonicalize_lines() but still shows the
+        # original text (context lines as the later pass has them); mode "blocks"
+        # compares GIMPLE basic blocks instead of lines (see block_diff), mode
+        # "insns" RTL insns by UID (see insn_diff)
+        if mode == "blocks":
+            return self.structural_diff(path1, path2, func_name)
+        if mode == "insns":
+            return self.rtl_insn_diff(path1, path2, func_name)
+        if func_name is not None:
+            shown = (self.load(path1, func_name), self.load(path2, func_name)) if canonical else (None, None)
+            return self.unified_diff(self.load(path1, func_name, canonical), self.load(path2, func_name, canonical),
+                                     3, "", *shown)
+
+        # Function by function, as a multi-file diff with one "file" per function:
+        # functions whose lines are unchanged cost one array comparison, so the work
+        # follows the size of the change rather than the size of the translation unit
+        sections1, sections2 = self.load_sections(path1, canonical), self.load_sections(path2, canonical)
+        raw1, raw2 = (self.load_sections(path1), self.load_sections(path2)) if canonical else (sections1, sections2)
+        empty = array("i")
+        diff = []
+        for name in list(sections2) + [name for name in sections1 if name not in sections2]:
+            diff += self.unified_diff(sections1.get(name, empty), sections2.get(name, empty), 3,
+                                      "" if name is None else f"Function {name}",
+                                      raw1.get(name, empty), raw2.get(name, empty))
+        return diff
+
+    def structural_diff(self, path1, path2, func_name=None):
+        if func_name is not None:
+            return self.block_diff(self.load(path1, func_name), self.load(path1, func_name, True),
+                                   self.load(path2, func_name), self.load(path2, func_name, True), "")
+        raw1, raw2 = self.load_sections(path1), self.load_sections(path2)
+        canon1, canon2 = self.load_sections(path1, True), self.load_sections(path2, True)
+        empty = array("i")
+        diff = []
+        for name in list(raw2) + [name for name in raw1 if name not in raw2]:
+            diff += self.block_diff(raw1.get(name, empty), canon1.get(name, empty),
+                                    raw2.get(name, empty), canon2.get(name, empty),
+                                    "" if name is None else f"Function {name}")
+        return diff
+
+    def block_diff(self, raw1, canon1, raw2, canon2, name):
+        # GIMPLE diff at basic-block granularity: blocks are matched by their
+        # canonical statements, so a block that was only renumbered or moved is
+        # reported as such instead of as a delete plus an insert. Statement diffs
+        # are computed inside edited blocks only, which keeps the quadratic
+        # matcher away from whole large functions.
+        if canon1 == canon2:
+            return []
+        blocks1, blocks2 = split_gimple_blocks(raw1, self.lines), split_gimple_blocks(raw2, self.lines)
+        if len(blocks1) < 2 and len(blocks2) < 2:
+            # No basic blocks (preamble, IPA or RTL text): plain line diff
+            return self.unified_diff(canon1, canon2, 3, name, raw1, raw2)
+
+        lines = self.lines
+        diff = [f"--- {name}", f"+++ {name}"]
+        unchanged = 0
+        for kind, i, j in match_gimple_blocks(blocks1, canon1, blocks2, canon2, lines):
+            if kind == "equal":
+                unchanged += 1
+                continue
+            if unchanged:
+                diff.append(f"= {unchanged} block{'s' if unchanged > 1 else ''} unchanged")
+                unchanged = 0
+            old = blocks1[i] if i is not None else None
+            new = blocks2[j] if j is not None else None
+            if kind == "deleted":
+                diff.append(f"@@ {old[0]} deleted @@")
+                diff.extend("-" + lines[k] for k in raw1[old[1]:old[2]])
+            elif kind == "inserted":
+                diff.append(f"@@ {new[0]} inserted @@")
+                diff.extend("+" + lines[k] for k in raw2[new[1]:new[2]])
+            else:
+                moved = "moved" in kind
+                edited = "edited" in kind
+                verb = " and ".join(word for word, flag in (("moved", moved), ("edited", edited)) if flag)
+                diff.append(f"@@ {old[0]} → {new[0]} {verb} @@")
+                if edited:
+                    a, b = canon1[old[1]:old[2]], canon2[new[1]:new[2]]
+                    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+                        if tag == "equal":
+                            diff.extend(" " + lines[k] for k in raw2[new[1] + j1:new[1] + j2])
+                            continue
+                        diff.extend("-" + lines[k] for k in raw1[old[1] + i1:old[1] + i2])
+                        diff.extend("+" + lines[k] for k in raw2[new[1] + j1:new[1] + j2])
+        if unchanged:
+            diff.append(f"= {unchanged} block{'s' if unchanged > 1 else ''} unchanged")
+        return diff
+
+    def insn_records(self, path, func_name):
+        # parse_rtl_insns() of one function (UIDs are only unique within a function)
+        key = (path, func_name)
+        insns = self.insns.get(key)
+        if insns is None:
+            insns = self.insns[key] = parse_rtl_insns(self.load(path, func_name), self.lines)
+        return insns
+
+    def rtl_insn_diff(self, path1, path2, func_name=None):
+        if func_name is not None:
+            return self.insn_diff(self.load(path1, func_name), self.load(path2, func_name), "")
+        sections1, sections2 = self.load_sections(path1), self.load_sections(path2)
+        empty = array("i")
+        diff = []
+        for name in list(sections2) + [name for name in sections1 if name not in sections2]:
+            diff += self.insn_diff(sections1.get(name, empty), sections2.get(name, empty),
+                                   "" if name is None else f"Function {name}")
+        return diff
+
+    def insn_diff(self, raw1, raw2, name):
+        # RTL diff keyed by insn UID: UIDs survive every RTL pass, so matching is
+        # one dict lookup per insn, and each insn is reported as added, deleted,
+        # rewritten (pattern changed), with changed notes, or moved (to another
+        # block, or out of order, as sched2 does). Dataflow and pass chatter
+        # between the insns is left out.
+        if raw1 == raw2:
+            return []
+        lines = self.lines
+        insns1, insns2 = parse_rtl_insns(raw1, lines), parse_rtl_insns(raw2, lines)
+        if not insns1 and not insns2:
+            return self.unified_diff(raw1, raw2, 3, name)
+
+        positions = dict((uid, k) for k, uid in enumerate(insns1))
+        order = [(j, positions[uid]) for j, uid in enumerate(insns2) if uid in positions]
+        in_order = set(longest_increasing_run(order))
+
+        diff = [f"--- {name}", f"+++ {name}"]
+        unchanged = 0
+        for j, (uid, new) in enumerate(insns2.items()):
+            old = insns1.get(uid)
+            label = f"{new['kind']} {uid}"
+            if old is None:
+                kind = f"added (bb {new['block']})" if new["block"] is not None else "added"
+            else:
+                words = []
+                if old["block"] != new["block"]:
+                    words.append(f"moved (bb {old['block']} → bb {new['block']})")
+                elif j not in in_order:
+                    words.append("moved")
+                if old["pattern"] != new["pattern"]:
+                    words.append("rewritten")
+                elif old["notes"] != new["notes"]:
+                    words.append("notes changed")
+                if not words:
+                    unchanged += 1
+                    continue
+                kind = " and ".join(words)
+            if unchanged:
+                diff.append(f"= {unchanged} insn{'s' if unchanged > 1 else ''} unchanged")
+                unchanged = 0
+            diff.append(f"@@ {label} {kind} @@")
+            if old is None:
+                diff.extend("+" + lines[k] for k in raw2[new["start"]:new["end"]])
+            elif old["pattern"] != new["pattern"] or old["notes"] != new["notes"]:
+                a, b = raw1[old["start"]:old["end"]], raw2[new["start"]:new["end"]]
+                for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+                    if tag == "equal":
+                        diff.extend(" " + lines[k] for k in b[j1:j2])
+                        continue
+                    diff.extend("-" + lines[k] for k in a[i1:i2])
+                    diff.extend("+" + lines[k] for k in b[j1:j2])
+        if unchanged and len(diff) > 2:
+            diff.append(f"= {unchanged} insn{'s' if unchanged > 1 else ''} unchanged")
+        for uid, old in insns1.items():
+            if uid not in insns2:
+                diff.append(f"@@ {old['kind']} {uid} deleted @@")
+                diff.extend("-" + lines[k] for k in raw1[old["start"]:old["end"]])
+        return diff if len(diff) > 2 else []
+
+class DumpLines:
+    # Lines of a loaded dump (or function) by position; text is looked up only
+    # for the lines asked for
+    def __init__(self, ids, lines):
+        self.ids = ids
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.lines[k] for k in self.ids[index]]
+        return self.lines[self.ids[index]]
+
+RTL_NOTES_INDENT = "     ("  # the REG_NOTES list of an insn starts at this indentation
+
+def parse_rtl_insns(ids, lines):
+    # OrderedDict(uid -> record) of the insns in dump order. A record is a dict
+    # with kind, block, pattern (the header text after the UID and chain
+    # numbers, then the ids of the following lines), notes (ids) and the
+    # start/end of its lines in ids. Notes and barriers
+    # carry UIDs too, but are bookkeeping and are not tracked.
+    insns = OrderedDict()
+    current = None
+    for k, line_id in enumerate(ids):
+        line = lines[line_id]
+        if current is not None:
+            if line[:1] in (" ", "\t") and line.strip():
+                if line.startswith(RTL_NOTES_INDENT) and current["notes"] is None:
+                    current["notes"] = []
+                (current["pattern"] if current["notes"] is None else current["notes"]).append(line_id)
+                continue
+            current["end"] = k
+            current["pattern"], current["notes"] = tuple(current["pattern"]), tuple(current["notes"] or ())
+            current = None
+        if not line.startswith("("):
+            continue
+        match = INSN_HEADER_RE.match(line)
+        if not match:
+            continue
+        kind = re.split(r"[/:]", match.group(1).lstrip()[1:])[0]
+        if kind in ("note", "barrier"):
+            continue
+        uid = int(match.group(2))
+        block = int(match.group(5)) if match.group(5) else None
+        # prev/next UIDs change whenever a neighbour does and sched2 marks issue
+        # groups with ":TI", so the header contributes only the text after them
+        current = {"kind": kind, "block": block, "start": k, "end": len(ids),
+                   "pattern": [kind + line[match.end():]], "notes": None}
+        insns[uid] = current
+    if current is not None:
+        current["pattern"], current["notes"] = tuple(current["pattern"]), tuple(current["notes"] or ())
+    return insns
+
+def insn_history(store, passes, func_name, uid):
+    # [(pass name, status, insn lines)] following one insn of func_name through
+    # a list of (pass name, path): where it first appears, every pass that
+    # rewrote it, changed its notes or moved it to another block, and where it
+    # was deleted. Dumps without the function's insns (passes that did not
+    # run on it) are skipped.
+    history = []
+    previous = None
+    for name, path in passes:
+        insns = store.insn_records(path, func_name)
+        if not insns:
+            continue
+        record = insns.get(uid)
+        if record is None:
+            if previous is not None:
+                history.append((name, "deleted", []))
+            previous = None
+            continue
+        if previous is None:
+            status = "present" if name == passes[0][0] else "added"
+        else:
+            words = []
+            if previous["block"] != record["block"]:
+                words.append(f"moved (bb {previous['block']} → bb {record['block']})")
+            if previous["pattern"] != record["pattern"]:
+                words.append("rewritten")
+            elif previous["notes"] != record["notes"]:
+                words.append("notes changed")
+            status = " and ".join(words)
+        if status:
+            ids = store.load(path, func_name)[record["start"]:record["end"]]
+            history.append((name, status, [store.lines[k].rstrip("\n") for k in ids]))
+        previous = record
+    return history
+
+GIMPLE_BLOCK_RE = re.compile(r"^\s*<bb (\d+)>")
+
+def split_gimple_blocks(ids, lines):
+    # [(label, start, end)] over a function's line ids: the declarations before
+    # the first "<bb N>" label, then one entry per basic block
+    blocks = [("declarations", 0, 0)]
+    for k, line_id in enumerate(ids):
+        match = GIMPLE_BLOCK_RE.match(lines[line_id])
+        if match:
+            blocks.append((f"<bb {match.group(1)}>", k, k))
+    bounds = [start for _, start, _ in blocks[1:]] + [len(ids)]
+    return [(label, start, end) for (label, start, _), end in zip(blocks, bounds)]
+
+def match_gimple_blocks(blocks1, canon1, blocks2, canon2, lines):
+    # [(kind, old index, new index)] in new-block order, deleted blocks last.
+    # kind is "equal", "moved", "edited", "moved edited", "inserted" or "deleted".
+    def signature(canon, block, with_label):
+        _, start, end = block
+        # The label line carries the block number and profile count; blocks that
+        # only changed those still match
+        return tuple(canon[start if with_label else start + 1:end])
+
+    old_by_signature = {}
+    for i, block in enumerate(blocks1):
+        old_by_signature.setdefault(signature(canon1, block, i == 0), deque()).append(i)
+
+    matched = {}  # new index -> (old index, edited)
+    for j, block in enumerate(blocks2):
+        candidates = old_by_signature.get(signature(canon2, block, j == 0))
+        if candidates:
+            matched[j] = (candidates.popleft(), False)
+
+    # What is left was edited, inserted or deleted: pair edited blocks by the
+    # share of statements they still have in common
+    def statements(canon, block):
+        return set(k for k in signature(canon, block, False) if lines[k].strip() not in ("", "}"))
+
+    used = set(i for i, _ in matched.values())
+    free_old = [i for i in range(len(blocks1)) if i not in used]
+    old_statements = dict((i, statements(canon1, blocks1[i])) for i in free_old)
+    for j in range(len(blocks2)):
+        if j in matched:
+            continue
+        if j == 0 and 0 in old_statements:
+            best = 0  # declarations always pair up
+        else:
+            new_statements = statements(canon2, blocks2[j])
+            best, best_score = None, 0.3
+            for i in free_old:
+                if i == 0:
+                    continue
+                union = len(old_statements[i] | new_statements)
+                score = len(old_statements[i] & new_statements) / union if union else 0
+                if score > best_score:
+                    best, best_score = i, score
+        if best is not None:
+            matched[j] = (best, True)
+            free_old.remove(best)
+
+    # Matched blocks outside the longest run kept in the same relative order moved
+    order = [(j, matched[j][0]) for j in sorted(matched)]
+    in_order = set(longest_increasing_run(order))
+    ops = []
+    for j in range(len(blocks2)):
+        if j not in matched:
+            ops.append(("inserted", None, j))
+            continue
+        i, edited = matched[j]
+        moved = j not in in_order
+        kind = " ".join(word for word, flag in (("moved", moved), ("edited", edited)) if flag) or "equal"
+        ops.append((kind, i, j))
+    ops.extend(("deleted", i, None) for i in free_old)
+    return ops
+
+def longest_increasing_run(pairs):
+    # New indices of the longest subsequence of (new, old) pairs whose old
+    # indices increase; O(n log n) patience sorting
+    tails, tail_at, parent = [], [], {}
+    for j, i in pairs:
+        k = bisect.bisect_left(tails, i)
+        parent[j] = tail_at[k - 1] if k else None
+        if k == len(tails):
+            tails.append(i)
+            tail_at.append(j)
+        else:
+            tails[k] = i
+            tail_at[k] = j
+    run = []
+    j = tail_at[-1] if tail_at else None
+    while j is not None:
+        run.append(j)
+        j = parent[j]
+    return run
+
+def unified_range(start, stop):
+    # Hunk range as difflib writes it: "3" for one line, "3,0" / "4,5" otherwise
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    return f"{start if not length else start + 1},{length}"
+
+def diff_pass_chunk(jobs):
+    # Module-level so pool processes can run it. Each worker reads its dumps into
+    # its own store (neighbouring pairs share a dump) and sends back only diff lines.
+    store = DumpStore()
+    return [store.diff(*job) for job in jobs]
+
+class PassDiffs:
+    # The pass pairs of a timeline. Nothing is read until a pair is displayed;
+    # computed diffs are kept in a small LRU cache, so opening a timeline is
+    # instant and memory stays flat however many passes were dumped.
+    CACHE_SIZE = 16
+
+    def __init__(self, pairs, func_name=None, store=None):
+        self.pairs = pairs  # [((name1, name2), (path1, path2))]; a None path is an empty dump
+        self.func_name = func_name  # restrict every dump to this function's body
+        self.canonical = False  # diff canonicalize_lines() output instead of the raw dumps
+        self.mode = "lines"  # or "blocks", "insns": see DumpStore.diff
+        self.store = store or DumpStore()  # may be shared by every timeline of one build
+        self.cache = OrderedDict()  # (index, mode, canonical) -> diff
+        self.lock = threading.Lock()  # the cache is filled from the prefetch thread too
+        self.prefetcher = None
+        self.prefetching = {}  # cache key -> Future
+        # Pairs whose dumps hash the same, once find_unchanged() has run: hashing
+        # reads every dump, so timelines run it in the background and start
+        # out with every pair listed
+        self.unchanged = set()
+        self.fingerprinted = False
+
+    def find_unchanged(self):
+        # Many passes leave the dump untouched; these pairs are never diffed
+        return set(i for i, (_, (path1, path2)) in enumerate(self.pairs)
+                   if self.store.fingerprint(path1, self.func_name) == self.store.fingerprint(path2, self.func_name))
+
+    def set_unchanged(self, unchanged):
+        self.unchanged = unchanged
+        self.fingerprinted = True
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def labels(self):
+        return [names for names, _ in self.pairs]
+
+    def rows(self):
+        # [(pair indices, unchanged)]: changed pairs one per row, each run of
+        # consecutive unchanged passes collapsed into a single row
+        rows = []
+        for i in range(len(self.pairs)):
+            if i in self.unchanged and rows and rows[-1][1]:
+                rows[-1][0].append(i)
+            else:
+                rows.append(([i], i in self.unchanged))
+        return rows
+
+    def set_canonical(self, canonical):
+        self.canonical = canonical
+
+    def set_mode(self, mode):
+        self.mode = mode
+
+    def cached(self, key):
+        with self.lock:
+            diff = self.cache.get(key)
+            if diff is not None:
+                self.cache.move_to_end(key)
+            return diff
+
+    def compute(self, key):
+        index, mode, canonical = key
+        _, (path1, path2) = self.pairs[index]
+        diff = self.store.diff(path1, path2, self.func_name, canonical, mode)
+        with self.lock:
+            self.cache[key] = diff
+            if len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return diff
+
+    def diff(self, index):
+        if index in self.unchanged:
+            return []
+        key = (index, self.mode, self.canonical)
+        diff = self.cached(key)
+        if diff is not None:
+            return diff
+        future = self.prefetching.pop(key, None)
+        # Already being prefetched: waiting is never slower than starting over
+        if future is not None and not future.cancel():
+            return future.result()
+        # Nothing queued may run alongside the pair asked for; the caller
+        # prefetches again around it afterwards
+        for other, queued in list(self.prefetching.items()):
+            if queued.cancel():
+                del self.prefetching[other]
+        return self.compute(key)
+
+    def context(self, index, function):
+        # DumpLines of the later dump of a pair, for the function a diff section
+        # is headed with (None for the text before the first function); the
+        # line numbers in its hunk headers index into it
+        _, (_, path2) = self.pairs[index]
+        if self.func_name is not None:
+            ids = self.store.load(path2, self.func_name)
+        else:
+            ids = self.store.load_sections(path2).get(function, array("i"))
+        return DumpLines(ids, self.store.lines)
+
+    def prefetch(self, indices):
+        # Computes these pairs on a background thread, nearest first, in the
+        # current mode. Prefetches of pairs no longer wanted are dropped unless
+        # already running; one thread, one pair per job, so a pair asked for
+        # with diff() waits for at most one prefetched pair.
+        wanted = [(i, self.mode, self.canonical) for i in indices if i not in self.unchanged]
+        for key, future in list(self.prefetching.items()):
+            if future.done() or (key not in wanted and future.cancel()):
+                del self.prefetching[key]
+        if self.prefetcher is None:
+            self.prefetcher = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        for key in wanted:
+            if key not in self.prefetching and self.cached(key) is None:
+                self.prefetching[key] = self.prefetcher.submit(self.compute, key)
+
+    def cancel_prefetch(self):
+        for future in self.prefetching.values():
+            future.cancel()
+        self.prefetching.clear()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown(wait=False)
+            self.prefetcher = None
+
+    def all_diffs(self, max_workers=None, progress=None, cancelled=None):
+        # Every diff at once (exports, statistics), spread over a process pool.
+        # Pool workers run the same DumpStore.diff as diff(), so results match
+        # it exactly; max_workers=1 stays in this process and uses our store.
+        # cancelled() is checked between pairs (chunks, with a pool) and makes
+        # it return None.
+        unchanged = self.unchanged if self.fingerprinted else self.find_unchanged()
+        changed = [i for i in range(len(self.pairs)) if i not in unchanged]
+        jobs = [self.pairs[i][1] + (self.func_name, self.canonical, self.mode) for i in changed]
+        workers = max_workers or os.cpu_count() or 1
+        diffs = []
+        if workers <= 1 or len(jobs) < 2:
+            for job in jobs:
+                if cancelled is not None and cancelled():
+                    return None
+                diffs.append(self.store.diff(*job))
+                if progress:
+                    progress(len(diffs), len(jobs))
+            return self.with_unchanged(changed, diffs)
+
+        # A few contiguous chunks per worker: fewer round trips, still even load
+        size = max(1, len(jobs) // (workers * 4))
+        chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(diff_pass_chunk, chunk) for chunk in chunks]
+            for future in futures:
+                if cancelled is not None and cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    return None
+                diffs.extend(future.result())
+                if progress:
+                    progress(len(diffs), len(jobs))
+        return self.with_unchanged(changed, diffs)
+
+    def with_unchanged(self, changed, diffs):
+        # Puts the computed diffs back in pass order, empty for the unchanged pairs
+        result = [[] for _ in self.pairs]
+        for i, diff in zip(changed, diffs):
+            result[i] = diff
+        return result
+
+def consecutive_pairs(passes):
+    return [((name1, name2), (file1, file2)) for (_, name1, file1), (_, name2, file2) in zip(passes, passes[1:])]
+
+def generate_pass_diffs(passes, store=None):
+    return PassDiffs(consecutive_pairs(passes), store=store)
+
+DIFF_COLORS = {"function": "blue", "added": "green", "removed": "red", "hunk": "purple", "summary": "gray"}
+
+def diff_line_style(line):
+    # Which DIFF_COLORS entry a diff line is drawn in, if any
+    if line.startswith("--- Function "):
+        return "function"
+    if line.startswith("+") and not line.startswith("+++"):
+        return "added"
+    if line.startswith("-") and not line.startswith("---"):
+        return "removed"
+    if line.startswith("@@ "):
+        return "hunk"
+    if line.startswith("= "):
+        return "summary"
+    return None
+
+def diff_display_line(line):
+    # "--- Function f" headers are shown as "Function f"; everything else as dumped
+    return line[4:].rstrip("\n") if line.startswith("--- Function ") else line.rstrip("\n")
+
+class DiffHighlighter(QSyntaxHighlighter):
+    # Colours a plain-text diff one block (line) at a time; Qt calls it only
+    # for blocks it lays out, and the text itself never goes through HTML
+    def __init__(self, document):
+        super().__init__(document)
+        self.formats = {}
+        for style, color in DIFF_COLORS.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            if style == "function":
+                fmt.setFontWeight(QFont.Bold)
+            self.formats[style] = fmt
 
-def generate_pass_diffs(passes):
-    diffs = []
-    for i in range(len(passes) - 1):
-        _, name1, file1 = passes[i]
-        _, name2, file2 = passes[i + 1]
-        with open(file1) as f1, open(file2) as f2:
-            lines1 = f1.readlines()
-            lines2 = f2.readlines()
-        diff = list(difflib.unified_diff(lines1, lines2, lineterm=""))
-        diffs.append(((name1, name2), diff))
-    return diffs
-
-class GimplePassDiffTimeline(QDialog):
-    def __init__(self, pass_diffs, parent=None):
+    def highlightBlock(self, text):
+        style = "function" if text.startswith("Function ") else diff_line_style(text)
+        if style:
+            self.setFormat(0, len(text), self.formats[style])
+
+class DiffModel(QAbstractListModel):
+    # One row per diff line. Views ask only for the rows they paint, so the
+    # cost of showing a diff does not grow with its length.
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("GIMPLE Pass Diff Timeline")
-        self.resize(1000, 600)
+        self.lines = []
+        self.row_size = QSize()
+        self.colors = dict((style, QColor(color)) for style, color in DIFF_COLORS.items())
+        self.bold_font = QFont("Courier", 10)
+        self.bold_font.setBold(True)
+
+    def set_lines(self, lines, row_size):
+        self.beginResetModel()
+        self.lines = lines
+        self.row_size = row_size
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        line = self.lines[index.row()]
+        if role == Qt.DisplayRole:
+            return diff_display_line(line)
+        if role == Qt.ForegroundRole:
+            style = diff_line_style(line)
+            return self.colors[style] if style else None
+        if role == Qt.FontRole and line.startswith("--- Function "):
+            return self.bold_font
+        if role == Qt.SizeHintRole:
+            return self.row_size
+        return None
+
+class DiffListView(QListView):
+    # Diff viewer over a DiffModel: rows all have the same height, so Qt lays
+    # out and paints only what is on screen, however long the diff
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFont(QFont("Courier", 10))
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QListView.ExtendedSelection)
+        self.setHorizontalScrollMode(QListView.ScrollPerPixel)
+        self.diff_model = DiffModel(self)
+        self.setModel(self.diff_model)
+
+    def prepare(self, diff):
+        # (lines, row size) for set_lines. Every row reports the width of the
+        # longest line, which sets the horizontal scroll range without
+        # measuring each row.
+        lines = [l for l in diff if not l.startswith("+++ Function ")]
+        metrics = QFontMetrics(self.font())
+        longest = max(map(len, lines)) if lines else 0
+        return lines, QSize(metrics.horizontalAdvance("x") * (longest + 2), metrics.height())
+
+    def set_lines(self, lines, row_size):
+        self.diff_model.set_lines(lines, row_size)
+        self.scrollToTop()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            QApplication.clipboard().setText("\n".join(self.diff_model.data(self.diff_model.index(row))
+                                                       for row in rows))
+            return
+        super().keyPressEvent(event)
+
+class RenderCache:
+    # Renderings of recently shown diffs by key, evicted least recently used
+    # first once their estimated footprint passes the budget. hits/misses are
+    # there to tune the budget.
+    def __init__(self, budget, on_evict=None):
+        self.budget = budget
+        self.on_evict = on_evict
+        self.entries = OrderedDict()  # key -> (rendering, estimated bytes)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, rendering, size):
+        if key in self.entries:
+            self.discard(key)
+        self.entries[key] = (rendering, size)
+        self.size += size
+        # The newest entry stays even when it alone is over budget: it is on screen
+        while self.size > self.budget and len(self.entries) > 1:
+            self.discard(next(iter(self.entries)))
+
+    def discard(self, key):
+        rendering, size = self.entries.pop(key)
+        self.size -= size
+        if self.on_evict:
+            self.on_evict(rendering)
+
+    def clear(self):
+        for key in list(self.entries):
+            self.discard(key)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def holds(self, rendering):
+        return any(entry[0] is rendering for entry in self.entries.values())
+
+    def summary(self):
+        return f"Render cache: {self.hits} hits, {self.misses} misses, {len(self.entries)} kept, {self.size / 2**20:.1f} MB"
+
+UNIFIED_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+class HunkItem(QTreeWidgetItem):
+    # payload: ("section", function, end of the last hunk), ("hunk", lines),
+    # ("gap", function, start, stop) or None for plain lines
+    payload = None
+
+class HunkView(QTreeWidget):
+    # A diff for review: one collapsed item per hunk (expanded on demand), and
+    # between hunks the unchanged lines as items that fetch them from the dump
+    # when expanded, so the whole function can be read without holding it or
+    # recomputing the diff
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHeaderHidden(True)
+        self.setFont(QFont("Courier", 10))
+        self.setUniformRowHeights(True)
+        self.setSelectionMode(QTreeWidget.ExtendedSelection)
+        self.itemExpanded.connect(self.fill_item)
+        self.colors = dict((style, QColor(color)) for style, color in DIFF_COLORS.items())
+        self.context = None
+
+    def set_diff(self, diff, context=None):
+        # context(function) gives the DumpLines the hunk line numbers refer to;
+        # without it (or for block and insn diffs) gaps are not shown
+        self.clear()
+        self.context = context
+        section = hunk = None
+        lines = iter(diff)
+        for line in lines:
+            if line.startswith("--- "):
+                name = line[4:].rstrip("\n")
+                next(lines, None)  # the matching "+++" header
+                self.close_section(section)
+                section = HunkItem(self, [name or "Diff"])
+                section.setFont(0, self.bold_font())
+                section.setForeground(0, self.colors["function"])
+                section.payload = ("section", name[9:] if name.startswith("Function ") else None, 0)
+                section.setExpanded(True)
+                hunk = None
+                continue
+            if section is None:
+                section = HunkItem(self, ["Diff"])
+                section.payload = ("section", None, 0)
+                section.setExpanded(True)
+            if line.startswith("@@ "):
+                self.add_gap(section, line)
+                hunk = HunkItem(section, [line.rstrip("\n")])
+                hunk.setForeground(0, self.colors["hunk"])
+                hunk.payload = ("hunk", [])
+                hunk.setChildIndicatorPolicy(HunkItem.ShowIndicator)
+                continue
+            if line.startswith("= ") or hunk is None:
+                item = HunkItem(section, [line.rstrip("\n")])
+                style = diff_line_style(line)
+                if style:
+                    item.setForeground(0, self.colors[style])
+                hunk = None
+                continue
+            hunk.payload[1].append(line)
+        self.close_section(section)
+        for i in range(self.topLevelItemCount()):
+            self.summarize_hunks(self.topLevelItem(i))
+
+    def bold_font(self):
+        font = QFont(self.font())
+        font.setBold(True)
+        return font
+
+    def add_gap(self, section, header):
+        # Unchanged lines between the end of the previous hunk (kept in the
+        # section's data) and the start of this one
+        match = UNIFIED_HUNK_RE.match(header)
+        if not match or self.context is None:
+            return
+        kind, function, end = section.payload
+        length = int(match.group(2)) if match.group(2) is not None else 1
+        start = int(match.group(1)) - 1 if length else int(match.group(1))
+        self.add_gap_item(section, function, end, start)
+        section.payload = (kind, function, start + length)
+
+    def close_section(self, section):
+        if section is None or self.context is None:
+            return
+        _, function, end = section.payload
+        if end:  # only sections with unified hunks
+            self.add_gap_item(section, function, end, len(self.context(function)))
 
-        self.sidebar = QListWidget()
-        self.text_view = QTextEdit()
+    def add_gap_item(self, section, function, start, stop):
+        if stop <= start:
+            return
+        count = stop - start
+        item = HunkItem(section, [f"⋯ {count} unchanged line{'s' if count > 1 else ''} ({start + 1}–{stop})"])
+        item.setForeground(0, self.colors["summary"])
+        item.payload = ("gap", function, start, stop)
+        item.setChildIndicatorPolicy(HunkItem.ShowIndicator)
+
+    def summarize_hunks(self, section):
+        for i in range(section.childCount()):
+            item = section.child(i)
+            data = item.payload
+            if data and data[0] == "hunk":
+                added = sum(1 for l in data[1] if l.startswith("+"))
+                removed = sum(1 for l in data[1] if l.startswith("-"))
+                item.setText(0, f"{item.text(0)}  (+{added} -{removed})")
+
+    def fill_item(self, item):
+        # Children are created the first time an item is expanded
+        data = item.payload
+        if not data or item.childCount():
+            return
+        if data[0] == "hunk":
+            lines = data[1]
+        elif data[0] == "gap":
+            _, function, start, stop = data
+            lines = [" " + line for line in self.context(function)[start:stop]]
+        else:
+            return
+        children = []
+        for line in lines:
+            child = HunkItem([line.rstrip("\n")])
+            style = diff_line_style(line)
+            if style:
+                child.setForeground(0, self.colors[style])
+            children.append(child)
+        item.addChildren(children)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            QApplication.clipboard().setText("\n".join(item.text(0) for item in self.selectedItems()))
+            return
+        super().keyPressEvent(event)
+
+class DiffView(QStackedWidget):
+    # Plain text with a DiffHighlighter for ordinary diffs: free text selection
+    # and every character as gcc wrote it. Highlighting still touches every
+    # line once on load, so very long diffs go to the DiffListView instead.
+    # Diffs shown with a key keep their highlighted document (or prepared list
+    # rows) in a RenderCache, so going back to them skips all of that.
+    PLAIN_TEXT_MAX_LINES = 50000
+    RENDER_CACHE_BYTES = 64 * 2**20
+    BYTES_PER_BLOCK = 200  # rough per-line overhead of a QTextDocument block and its layout
+    BYTES_PER_ROW = 64  # rough per-line overhead of a Python str in the list model
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text_view = QPlainTextEdit()
         self.text_view.setReadOnly(True)
         self.text_view.setFont(QFont("Courier", 10))
+        self.text_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.list_view = DiffListView()
+        self.hunk_view = HunkView()
+        self.addWidget(self.text_view)
+        self.addWidget(self.list_view)
+        self.addWidget(self.hunk_view)
+        self.cache = RenderCache(self.RENDER_CACHE_BYTES, self.release)
+        self.empty = self.make_document([])
+        self.shown = None
+        self.show_rendering(("text", self.empty))
+
+    def make_document(self, lines):
+        document = QTextDocument(self)
+        document.setDocumentLayout(QPlainTextDocumentLayout(document))
+        document.setDefaultFont(self.text_view.font())
+        DiffHighlighter(document)  # owned by the document
+        document.setPlainText("\n".join(lines))
+        return document
+
+    def render(self, diff):
+        # (rendering, estimated bytes)
+        if len(diff) > self.PLAIN_TEXT_MAX_LINES:
+            lines, row_size = self.list_view.prepare(diff)
+            return ("list", lines, row_size), sum(map(len, lines)) + self.BYTES_PER_ROW * len(lines)
+        lines = [diff_display_line(l) for l in diff if not l.startswith("+++ Function ")]
+        size = sum(map(len, lines)) * 2 + self.BYTES_PER_BLOCK * len(lines)
+        return ("text", self.make_document(lines)), size
+
+    def set_diff(self, diff, key=None):
+        rendering = self.cache.get(key) if key is not None else None
+        if rendering is None:
+            rendering, size = self.render(diff)
+            if key is not None:
+                self.cache.put(key, rendering, size)
+        self.show_rendering(rendering)
+
+    def show_rendering(self, rendering):
+        previous, self.shown = self.shown, rendering
+        if rendering[0] == "list":
+            self.text_view.setDocument(self.empty)
+            self.list_view.set_lines(rendering[1], rendering[2])
+            self.setCurrentWidget(self.list_view)
+        else:
+            self.list_view.set_lines([], QSize())
+            self.text_view.setDocument(rendering[1])
+            self.setCurrentWidget(self.text_view)
+        # Uncached (or already evicted) documents are not needed once replaced
+        if previous is not None and previous is not rendering and not self.cache.holds(previous):
+            self.release(previous)
+
+    def release(self, rendering):
+        if rendering is not self.shown and rendering[0] == "text" and rendering[1] is not self.empty:
+            rendering[1].deleteLater()
+
+    def set_message(self, text):
+        self.set_diff(text.splitlines())
+
+    def set_hunks(self, diff, context=None):
+        # Collapsed hunks in a HunkView (see there); not cached, since only the
+        # hunk headers are laid out
+        self.hunk_view.set_diff(diff, context)
+        self.setCurrentWidget(self.hunk_view)
+
+    def clear_cache(self):
+        self.cache.clear()
+
+class PassDiffTimeline(QDialog):
+    TITLE = "Pass Diff Timeline"
+    DIFF_MODES = [("Line diff", "lines")]
+    PREFETCH_ROWS = 3  # changed rows on each side of the selection computed ahead
+    compare_window = None
+    pass_diffs = None
+
+    def __init__(self, pass_diffs, parent=None, remarks=None):
+        super().__init__(parent)
+        self.setWindowTitle(self.TITLE)
+        self.resize(1000, 600)
+        self.diff_workers = None  # processes for exporting; None means one per core
+        self.export_worker = None
 
-        for (name1, name2), _ in pass_diffs:
-            self.sidebar.addItem(f"{name1} → {name2}")
+        self.sidebar = QListWidget()
+        self.remarks_view = QTextEdit()
+        self.remarks_view.setReadOnly(True)
+        self.remarks_view.hide()
+        self.diff_view = DiffView()
 
-        self.pass_diffs = dict(((name1, name2), diff) for (name1, name2), diff in pass_diffs)
         self.sidebar.currentRowChanged.connect(self.display_diff)
 
+        # Remarks of the selected pass above its diff
+        right = QSplitter(Qt.Vertical)
+        right.addWidget(self.remarks_view)
+        right.addWidget(self.diff_view)
+        right.setStretchFactor(1, 3)
+
         splitter = QSplitter()
         splitter.addWidget(self.sidebar)
-        splitter.addWidget(self.text_view)
+        splitter.addWidget(right)
+
+        self.export_button = QPushButton("Export All Diffs...")
+        self.export_button.clicked.connect(self.export_diffs)
+        compare_button = QPushButton("Compare Passes...")
+        compare_button.clicked.connect(self.compare_passes)
+        self.export_progress = QProgressBar()
+        self.export_progress.hide()
+
+        self.canonical_box = QCheckBox("Ignore renumbering (SSA versions, D.N, blocks, insn UIDs)")
+        self.canonical_box.toggled.connect(self.set_canonical)
+        self.hunks_box = QCheckBox("Collapse hunks")
+        self.hunks_box.toggled.connect(lambda: self.display_diff(self.sidebar.currentRow()))
+
+        self.mode_box = QComboBox()
+        for label, mode in self.DIFF_MODES:
+            self.mode_box.addItem(label, mode)
+        self.mode_box.setVisible(len(self.DIFF_MODES) > 1)
+        self.mode_box.currentIndexChanged.connect(self.set_mode)
+
+        self.cache_label = QLabel()
+        self.cache_label.setStyleSheet("color: gray;")
+
+        bottom = self.bottom_bar = QHBoxLayout()
+        bottom.addWidget(self.mode_box)
+        bottom.addWidget(self.canonical_box)
+        bottom.addWidget(self.hunks_box)
+        bottom.addWidget(self.cache_label)
+        bottom.addWidget(self.export_progress, 1)
+        bottom.addWidget(compare_button)
+        bottom.addWidget(self.export_button)
 
         layout = QVBoxLayout()
         layout.addWidget(splitter)
+        layout.addLayout(bottom)
         self.setLayout(layout)
 
-        self.sidebar.setCurrentRow(0)
+        self.set_pass_diffs(pass_diffs, remarks)
+
+    def set_pass_diffs(self, pass_diffs, remarks=None):
+        # Replaces the timeline in place; stays on the same pass pair if it still exists
+        self.remarks = remarks
+        current = self.sidebar.currentItem().text() if self.sidebar.currentItem() else None
+        if self.pass_diffs is not None and self.pass_diffs is not pass_diffs:
+            self.pass_diffs.cancel_prefetch()
+        self.pass_diffs = pass_diffs
+        self.diff_view.clear_cache()
+        pass_diffs.set_canonical(self.canonical_box.isChecked())
+        pass_diffs.set_mode(self.mode_box.currentData())
+        self.fill_sidebar(current)
+        if self.compare_window is not None:
+            self.compare_window.set_passes(pass_diffs.store, self.dump_passes(), pass_diffs.func_name)
+
+        if not pass_diffs.fingerprinted:
+            # Parented to the application, like exports; the result goes to a
+            # bound method, which Qt disconnects if this dialog is deleted first
+            worker = FunctionWorker(lambda: (pass_diffs, pass_diffs.find_unchanged()), parent=QApplication.instance())
+            worker.result_ready.connect(self.on_unchanged_found)
+            start_detached(worker)
+
+    def on_unchanged_found(self, result):
+        pass_diffs, unchanged = result
+        pass_diffs.set_unchanged(unchanged)
+        if pass_diffs is not self.pass_diffs:
+            return
+        # Collapse the unchanged runs, staying on the selected pair
+        row = self.sidebar.currentRow()
+        index = self.rows[row][0][0] if 0 <= row < len(self.rows) else None
+        self.fill_sidebar(None, index)
+
+    def fill_sidebar(self, current_label, current_index=None):
+        pass_diffs = self.pass_diffs
+        labels = pass_diffs.labels()
+        self.rows = pass_diffs.rows()
+        self.sidebar.blockSignals(True)
+        self.sidebar.clear()
+        for indices, unchanged in self.rows:
+            if not unchanged:
+                name1, name2 = labels[indices[0]]
+                self.sidebar.addItem(f"{name1} → {name2}")
+                continue
+            count = len(indices)
+            item = QListWidgetItem(f"{labels[indices[0]][0]} → {count} pass{'es' if count > 1 else ''}, no change")
+            item.setForeground(QColor("gray"))
+            item.setToolTip("\n".join(labels[i][1] for i in indices))
+            self.sidebar.addItem(item)
+        self.sidebar.blockSignals(False)
+
+        labels = [self.sidebar.item(i).text() for i in range(self.sidebar.count())]
+        rows = [r for r, (indices, _) in enumerate(self.rows) if current_index in indices]
+        if rows:
+            self.sidebar.setCurrentRow(rows[0])
+        else:
+            self.sidebar.setCurrentRow(labels.index(current_label) if current_label in labels else 0)
 
-    def display_diff(self, index):
-        item_text = self.sidebar.item(index).text()
-        name1, name2 = item_text.split(" → ")
-        diff = self.pass_diffs.get((name1, name2), [])
-        html = "<pre>" + "\n".join(
-            f'<span style="color:green;">{l}</span>' if l.startswith('+') and not l.startswith('+++') else
-            f'<span style="color:red;">{l}</span>' if l.startswith('-') and not l.startswith('---') else
-            l for l in diff
-        ) + "</pre>"
-        self.text_view.setHtml(html)
+    def set_canonical(self, canonical):
+        self.pass_diffs.set_canonical(canonical)
+        self.display_diff(self.sidebar.currentRow())
+
+    def set_mode(self, index):
+        mode = self.mode_box.itemData(index)
+        # Block diffs always match blocks in canonical form
+        self.canonical_box.setEnabled(mode == "lines")
+        self.pass_diffs.set_mode(mode)
+        self.display_diff(self.sidebar.currentRow())
+
+    def display_diff(self, row):
+        if row < 0:
+            return
+        indices, unchanged = self.rows[row]
+        labels = self.pass_diffs.labels()
+        if unchanged:
+            names = [labels[i][1] for i in indices]
+            self.show_remarks("".join(self.pass_remarks_html(name) for name in names))
+            self.diff_view.set_message(f"No change after {labels[indices[0]][0]}:\n  " + "\n  ".join(names))
+            self.prefetch_around(row)
+            return
+
+        index = indices[0]
+        _, name2 = labels[index]
+        self.show_remarks(self.pass_remarks_html(name2))
+        if self.hunks_box.isChecked():
+            pass_diffs = self.pass_diffs
+            self.diff_view.set_hunks(pass_diffs.diff(index), lambda function: pass_diffs.context(index, function))
+        else:
+            key = (index, self.pass_diffs.mode, self.pass_diffs.canonical)
+            # A cached rendering needs no diff at all
+            self.diff_view.set_diff(self.pass_diffs.diff(index) if key not in self.diff_view.cache else None, key)
+            self.cache_label.setText(self.diff_view.cache.summary())
+        self.prefetch_around(row)
+
+    def prefetch_around(self, row):
+        # Next and previous changed rows, nearest first, so stepping through the
+        # timeline finds its diffs computed; a jump elsewhere drops the rest
+        nearby = []
+        for distance in range(1, len(self.rows)):
+            for r in (row + distance, row - distance):
+                if 0 <= r < len(self.rows) and not self.rows[r][1]:
+                    nearby.append(self.rows[r][0][0])
+            if len(nearby) >= 2 * self.PREFETCH_ROWS:
+                break
+        self.pass_diffs.prefetch(nearby)
 
-def generate_rtl_pass_diffs(passes):
-    diffs = []
-    for i in range(len(passes) - 1):
-        _, name1, file1 = passes[i]
-        _, name2, file2 = passes[i + 1]
-        with open(file1) as f1, open(file2) as f2:
-            lines1 = f1.readlines()
-            lines2 = f2.readlines()
-        diff = list(difflib.unified_diff(lines1, lines2, lineterm=""))
-        diffs.append(((name1, name2), diff))
-    return diffs
-
-class RtlPassDiffTimeline(QDialog):
-    def __init__(self, pass_diffs, parent=None):
+    def closeEvent(self, event):
+        self.pass_diffs.cancel_prefetch()
+        super().closeEvent(event)
+
+    def show_remarks(self, html):
+        self.remarks_view.setHtml(html)
+        self.remarks_view.setVisible(bool(html))
+
+    def dump_passes(self):
+        # [(pass name, path)] of every dump on the timeline, in pass order
+        pairs = self.pass_diffs.pairs
+        passes = [(name1, path1) for (name1, _), (path1, _) in pairs[:1] if path1 is not None]
+        return passes + [(name2, path2) for (_, name2), (_, path2) in pairs]
+
+    def compare_passes(self):
+        if self.compare_window is None:
+            self.compare_window = PassCompareWindow(self.pass_diffs.store, self.dump_passes(),
+                                                    self.pass_diffs.func_name, self.DIFF_MODES, self)
+        self.compare_window.show()
+        self.compare_window.raise_()
+
+    def pass_remarks_html(self, label):
+        # Unified labels carry the dump number ("085i.inline"); remarks only the pass name
+        if not self.remarks:
+            return ""
+        remarks = self.remarks.filter(**{"pass": label.split(".", 1)[-1]})
+        return remarks_html(remarks) if remarks else ""
+
+    def export_diffs(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export All Diffs", "passes.diff", "Diff Files (*.diff);;All Files (*)")
+        if not path:
+            return
+        pass_diffs, max_workers = self.pass_diffs, self.diff_workers
+        labels = pass_diffs.labels()
+
+        def export(progress, cancelled):
+            diffs = pass_diffs.all_diffs(max_workers, progress, cancelled)
+            if diffs is None:
+                return
+            with open(path, "w") as f:
+                for (name1, name2), diff in zip(labels, diffs):
+                    f.write(f"### {name1} → {name2}\n")
+                    f.writelines(l if l.endswith("\n") else l + "\n" for l in diff)
+
+        # The dialog may be closed (and deleted) mid-export: the file is written
+        # on the worker, which is parented to the application, and only bound
+        # methods are connected, which Qt disconnects when the dialog goes
+        worker = FunctionWorker(export, parent=QApplication.instance(), with_progress=True, cancellable=True)
+        worker.progress.connect(self.on_export_progress)
+        worker.result_ready.connect(self.on_export_ready)
+        worker.failed.connect(self.on_export_failed)
+        self.export_worker = worker
+        self.export_button.setEnabled(False)
+        self.export_progress.setRange(0, len(labels))
+        self.export_progress.setValue(0)
+        self.export_progress.show()
+        start_detached(worker)
+
+    def on_export_ready(self, _):
+        self.finish_export()
+
+    def on_export_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Could not export diffs:\n{message}")
+        self.finish_export()
+
+    def on_export_progress(self, done, total):
+        # Only changed pairs are diffed, so total is below the number of pairs
+        self.export_progress.setRange(0, total)
+        self.export_progress.setValue(done)
+
+    def finish_export(self):
+        self.export_worker = None
+        self.export_button.setEnabled(True)
+        self.export_progress.hide()
+
+class PassCompareWindow(QDialog):
+    # Diffs any two passes of a timeline ("cfg" against "optimized", "expand"
+    # against "final"), over the whole dump or one function. The timeline's
+    # DumpStore already holds most dumps, so nothing is read twice; diffs are
+    # computed on a worker thread and the last few are kept.
+    CACHE_SIZE = 16
+
+    def __init__(self, store, passes, func_name=None, modes=PassDiffTimeline.DIFF_MODES, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("RTL Pass Diff Timeline")
+        self.setWindowTitle("Compare Passes")
         self.resize(1000, 600)
+        self.cache = OrderedDict()  # (path1, path2, function, mode) -> diff
+        self.worker = None
+        self.pending = None
+        self.store = None
+
+        self.first_combo = QComboBox()
+        self.second_combo = QComboBox()
+        self.function_combo = QComboBox()
+        self.mode_box = QComboBox()
+        for label, mode in modes:
+            self.mode_box.addItem(label, mode)
+        self.mode_box.setVisible(len(modes) > 1)
+        for combo in (self.first_combo, self.second_combo, self.function_combo, self.mode_box):
+            combo.currentIndexChanged.connect(self.compare)
+
+        self.diff_view = DiffView()
+
+        pickers = QHBoxLayout()
+        pickers.addWidget(self.first_combo, 1)
+        pickers.addWidget(QLabel("→"))
+        pickers.addWidget(self.second_combo, 1)
+        pickers.addWidget(QLabel("Function:"))
+        pickers.addWidget(self.function_combo, 1)
+        pickers.addWidget(self.mode_box)
+
+        layout = QVBoxLayout()
+        layout.addLayout(pickers)
+        layout.addWidget(self.diff_view)
+        self.setLayout(layout)
+
+        self.set_passes(store, passes, func_name)
+
+    def set_passes(self, store, passes, func_name=None):
+        # Keeps the chosen passes and function when a rebuild replaces the dumps
+        if store is not self.store:
+            self.cache.clear()
+        self.store = store
+        self.passes = passes
+        self.func_name = func_name
+        names = [name for name, _ in passes]
+        for combo, default in ((self.first_combo, 0), (self.second_combo, len(names) - 1)):
+            current = combo.currentText()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItems(names)
+            combo.setCurrentIndex(combo.findText(current) if current in names else default)
+            combo.blockSignals(False)
+
+        if func_name is not None:
+            functions = [func_name]
+        else:
+            functions = ["All functions"]
+            for _, path in passes[-1:]:
+                functions += [name for name in store.load_sections(path) if name is not None and "'" not in name]
+        current = self.function_combo.currentText()
+        self.function_combo.blockSignals(True)
+        self.function_combo.clear()
+        self.function_combo.addItems(functions)
+        self.function_combo.setCurrentIndex(max(self.function_combo.findText(current), 0))
+        self.function_combo.blockSignals(False)
+        self.compare()
+
+    def selection(self):
+        i, j = self.first_combo.currentIndex(), self.second_combo.currentIndex()
+        if i < 0 or j < 0:
+            return None
+        function = self.function_combo.currentText()
+        if self.func_name is None and self.function_combo.currentIndex() <= 0:
+            function = None
+        return (self.passes[i][1], self.passes[j][1], function, self.mode_box.currentData())
+
+    def compare(self):
+        key = self.selection()
+        if key is None:
+            return
+        if key in self.cache or key in self.diff_view.cache:
+            self.show_diff(key, self.cache.get(key))
+            return
+        self.pending = key
+        if self.worker is not None:
+            return  # picked up when the running comparison finishes
+        self.diff_view.set_message("Comparing...")
+        path1, path2, function, mode = key
+        # Closing a project timeline deletes this window with it, so the worker
+        # belongs to the application and reports only to bound methods, which
+        # Qt disconnects then; the key it computes travels with it
+        worker = FunctionWorker(self.store.diff, path1, path2, function, False, mode, parent=QApplication.instance())
+        worker.key = key
+        worker.result_ready.connect(self.on_diff_ready)
+        worker.failed.connect(self.on_diff_failed)
+        self.worker = worker
+        start_detached(worker)
+
+    def on_diff_ready(self, diff):
+        key = self.worker.key
+        self.worker = None
+        self.cache[key] = diff
+        if len(self.cache) > self.CACHE_SIZE:
+            self.cache.popitem(last=False)
+        # The selection may have moved on while this one was computed
+        if self.pending == key:
+            self.show_diff(key, diff)
+        else:
+            self.compare()
+
+    def on_diff_failed(self, message):
+        key = self.worker.key
+        self.worker = None
+        if self.pending == key:
+            self.diff_view.set_message(f"Could not compare the passes:\n{message}")
+        else:
+            self.compare()
+
+    def show_diff(self, key, diff):
+        self.pending = None
+        if key[0] == key[1]:
+            self.diff_view.set_message("Pick two different passes.")
+        elif key in self.diff_view.cache:
+            self.diff_view.set_diff(None, key)
+        elif not diff:
+            self.diff_view.set_message("No difference.")
+        else:
+            self.diff_view.set_diff(diff, key)
+
+class GimplePassDiffTimeline(PassDiffTimeline):
+    TITLE = "GIMPLE Pass Diff Timeline"
+    DIFF_MODES = PassDiffTimeline.DIFF_MODES + [("Block diff (basic blocks)", "blocks")]
+
+def generate_rtl_pass_diffs(passes, store=None):
+    return generate_pass_diffs(passes, store)
+
+class RtlPassDiffTimeline(PassDiffTimeline):
+    TITLE = "RTL Pass Diff Timeline"
+    DIFF_MODES = PassDiffTimeline.DIFF_MODES + [("Insn diff (by UID)", "insns")]
+    history_window = None
+
+    def __init__(self, pass_diffs, parent=None, remarks=None):
+        super().__init__(pass_diffs, parent, remarks)
+        follow_button = QPushButton("Follow Insn...")
+        follow_button.clicked.connect(self.follow_insn)
+        self.bottom_bar.insertWidget(2, follow_button)
+
+    def set_pass_diffs(self, pass_diffs, remarks=None):
+        super().set_pass_diffs(pass_diffs, remarks)
+        if self.history_window is not None:
+            self.history_window.set_passes(pass_diffs.store, self.dump_passes(), pass_diffs.func_name)
+
+    def follow_insn(self):
+        if self.history_window is None:
+            self.history_window = InsnHistoryWindow(self.pass_diffs.store, self.dump_passes(),
+                                                    self.pass_diffs.func_name, self)
+        self.history_window.show()
+        self.history_window.raise_()
+
+class InsnHistoryWindow(QDialog):
+    # Follows one insn UID of one function through every pass of an RTL
+    # timeline (combine, IRA/reload, sched2, ...), showing it wherever it changed
+    def __init__(self, store, passes, func_name=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Follow Insn")
+        self.resize(800, 600)
+
+        self.function_combo = QComboBox()
+        self.uid_edit = QLineEdit()
+        self.uid_edit.setPlaceholderText("Insn UID")
+        self.uid_edit.returnPressed.connect(self.show_history)
+        follow_button = QPushButton("Follow")
+        follow_button.clicked.connect(self.show_history)
+        self.function_combo.currentIndexChanged.connect(self.show_history)
 
-        self.sidebar = QListWidget()
         self.text_view = QTextEdit()
         self.text_view.setReadOnly(True)
         self.text_view.setFont(QFont("Courier", 10))
 
-        for (name1, name2), _ in pass_diffs:
-            self.sidebar.addItem(f"{name1} → {name2}")
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Function:"))
+        controls.addWidget(self.function_combo, 1)
+        controls.addWidget(QLabel("UID:"))
+        controls.addWidget(self.uid_edit)
+        controls.addWidget(follow_button)
+
+        layout = QVBoxLayout()
+        layout.addLayout(controls)
+        layout.addWidget(self.text_view)
+        self.setLayout(layout)
+
+        self.set_passes(store, passes, func_name)
 
-        self.pass_diffs = dict(((name1, name2), diff) for (name1, name2), diff in pass_diffs)
+    def set_passes(self, store, passes, func_name=None):
+        self.store = store
+        self.passes = passes
+        if func_name is not None:
+            functions = [func_name]
+        else:
+            functions = []
+            for _, path in passes[-1:]:
+                functions = [name for name in store.load_sections(path) if name is not None and "'" not in name]
+        current = self.function_combo.currentText()
+        self.function_combo.blockSignals(True)
+        self.function_combo.clear()
+        self.function_combo.addItems(functions)
+        self.function_combo.setCurrentIndex(max(self.function_combo.findText(current), 0))
+        self.function_combo.blockSignals(False)
+        self.show_history()
+
+    def show_history(self):
+        uid = self.uid_edit.text().strip()
+        func_name = self.function_combo.currentText()
+        if not uid.isdigit() or not func_name:
+            self.text_view.setPlainText("Enter the UID of an insn, e.g. 12 for (insn 12 ...).")
+            return
+        history = insn_history(self.store, self.passes, func_name, int(uid))
+        if not history:
+            self.text_view.setPlainText(f"No insn {uid} in {func_name} in any dumped pass.")
+            return
+        html = ""
+        for name, status, lines in history:
+            color = "red" if status == "deleted" else "green" if status == "added" else "purple"
+            html += f'<b>{html_escape(name)}</b>: <span style="color:{color};">{html_escape(status)}</span>'
+            html += "<pre>" + html_escape("\n".join(lines)) + "</pre>" if lines else "<br>"
+        self.text_view.setHtml(html)
+
+
+def parse_dump_passes(text):
+    # Parses the pass tree gcc prints for -fdump-passes into (kind, name, enabled)
+    # in pipeline order. Passes starting with '*' have no dump file and are skipped.
+    passes = []
+    for line in text.splitlines():
+        match = re.match(r'^\s*(tree|ipa|rtl)-(\S+)\s*:\s*(ON|OFF)\s*$', line)
+        if match:
+            passes.append((match.group(1), match.group(2), match.group(3) == "ON"))
+    return passes
+
+class PassPickerDialog(QDialog):
+    def __init__(self, pass_names, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Select Passes to Dump")
+        self.resize(400, 600)
+
+        self.pass_list = QListWidget()
+        for i, name in enumerate(pass_names):
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            # Start with the first and last pass so the timeline has something to show
+            checked = i == 0 or i == len(pass_names) - 1
+            item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
+            self.pass_list.addItem(item)
+
+        select_all = QPushButton("Select All")
+        select_all.clicked.connect(lambda: self.set_all(Qt.Checked))
+        select_none = QPushButton("Select None")
+        select_none.clicked.connect(lambda: self.set_all(Qt.Unchecked))
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        toggles = QHBoxLayout()
+        toggles.addWidget(select_all)
+        toggles.addWidget(select_none)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Passes enabled at this optimization level"))
+        layout.addWidget(self.pass_list)
+        layout.addLayout(toggles)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def set_all(self, state):
+        for i in range(self.pass_list.count()):
+            self.pass_list.item(i).setCheckState(state)
+
+    def selected_passes(self):
+        return [self.pass_list.item(i).text() for i in range(self.pass_list.count())
+                if self.pass_list.item(i).checkState() == Qt.Checked]
+
+class SelectivePassTimeline(QDialog):
+    # Timeline over every enabled pass where only some have been dumped. Each row
+    # diffs a pass against the nearest earlier dumped pass; selecting a pass that
+    # has no dump yet asks fetch_passes to dump it (and a few following passes).
+    FETCH_AHEAD = 4
+
+    def __init__(self, title, pass_names, fetch_passes, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(1000, 600)
+
+        self.pass_names = pass_names
+        self.fetch_passes = fetch_passes
+        self.dump_files = {}
+        self.fetched = set()
+        self.store = DumpStore()
+
+        self.sidebar = QListWidget()
+        self.diff_view = DiffView()
+
+        for name in pass_names:
+            self.sidebar.addItem(name)
+        self.refresh_labels()
         self.sidebar.currentRowChanged.connect(self.display_diff)
 
         splitter = QSplitter()
         splitter.addWidget(self.sidebar)
-        splitter.addWidget(self.text_view)
+        splitter.addWidget(self.diff_view)
 
         layout = QVBoxLayout()
         layout.addWidget(splitter)
         self.setLayout(layout)
 
-        self.sidebar.setCurrentRow(0)
+    def set_dump_files(self, dump_files, fetched_names):
+        self.dump_files = dump_files
+        self.fetched.update(fetched_names)
+        self.refresh_labels()
+        if self.sidebar.currentRow() < 0:
+            self.sidebar.setCurrentRow(self.first_dumped_row())
+        else:
+            self.display_diff(self.sidebar.currentRow())
+
+    def set_fetch_failed(self, names, errors):
+        # The passes stay unfetched, so selecting one of them compiles again
+        index = self.sidebar.currentRow()
+        if index < 0 or self.pass_names[index] in names:
+            self.diff_view.set_message(f"gcc failed while dumping {', '.join(names)}:\n{errors}")
+
+    def first_dumped_row(self):
+        for i, name in enumerate(self.pass_names):
+            if name in self.dump_files:
+                return i
+        return 0
+
+    def previous_dumped(self, index):
+        for name in reversed(self.pass_names[:index]):
+            if name in self.dump_files:
+                return name
+        return None
+
+    def refresh_labels(self):
+        for i, name in enumerate(self.pass_names):
+            if name in self.dump_files:
+                prev = self.previous_dumped(i)
+                label = f"{prev} → {name}" if prev else name
+            elif name in self.fetched:
+                label = f"{name} (no dump produced)"
+            else:
+                label = f"{name} (not dumped)"
+            self.sidebar.item(i).setText(label)
 
     def display_diff(self, index):
-        item_text = self.sidebar.item(index).text()
-        name1, name2 = item_text.split(" → ")
-        diff = self.pass_diffs.get((name1, name2), [])
-        html = "<pre>" + "\n".join(
-            f'<span style="color:green;">{l}</span>' if l.startswith('+') and not l.startswith('+++') else
-            f'<span style="color:red;">{l}</span>' if l.startswith('-') and not l.startswith('---') else
-            l for l in diff
-        ) + "</pre>"
-        self.text_view.setHtml(html)
+        if index < 0:
+            return
+        name = self.pass_names[index]
+        if name not in self.dump_files:
+            if name in self.fetched:
+                self.diff_view.set_message(f"gcc did not produce a dump for {name} at this optimization level.")
+                return
+            self.diff_view.set_message(f"Dumping {name}...")
+            wanted = [n for n in self.pass_names[index:index + self.FETCH_AHEAD]
+                      if n not in self.dump_files and n not in self.fetched]
+            self.fetch_passes(wanted)
+            return
+
+        prev = self.previous_dumped(index)
+        if prev is None:
+            self.diff_view.set_message(f"{name} is the first dumped pass; nothing to compare against.")
+            return
+
+        self.diff_view.set_diff(self.store.diff(self.dump_files[prev], self.dump_files[name]))
+
+
+def find_unified_passes(build_dir):
+    # All tree (t), IPA (i) and RTL (r) dumps in gcc's own pass-number order,
+    # labelled with their dump suffix (e.g. "085i.inline") so names stay unique
+    passes = []
+    for f in glob.glob(os.path.join(build_dir, "*")):
+        match = re.search(r"\.(\d+)([tir])\.([^.]+)$", f)
+        if match:
+            num, kind, name = int(match.group(1)), match.group(2), match.group(3)
+            passes.append((num, kind, f"{match.group(1)}{kind}.{name}", f))
+    # Several IPA reports (cgraph, type-inheritance, ipa-clones) share number 0
+    return sorted(passes, key=lambda x: (x[0], x[1], x[2]))
+
+def generate_unified_pass_diffs(passes, store=None, func_name=None):
+    # Each pass is diffed against the previous dump of the same kind: IPA dumps
+    # describe the call graph, tree and RTL dumps the function bodies. Dumps
+    # numbered 0 are standalone reports rather than passes, so each is shown
+    # whole and none is chained to the next.
+    pairs = []
+    previous = {}
+    for num, kind, label, path in passes:
+        if num == 0:
+            pairs.append((("(start)", label), (None, path)))
+            continue
+        prev_label, prev_path = previous.get(kind, ("(start)", None))
+        pairs.append(((prev_label, label), (prev_path, path)))
+        previous[kind] = (label, path)
+    return PassDiffs(pairs, func_name, store)
+
+class UnifiedPassDiffTimeline(PassDiffTimeline):
+    TITLE = "Unified Pass Timeline (IPA + GIMPLE + RTL)"
+    DIFF_MODES = GimplePassDiffTimeline.DIFF_MODES + RtlPassDiffTimeline.DIFF_MODES[1:]
+
+
+class BuildWorker(QThread):
+    # Runs one gcc command off the GUI thread. stderr is streamed line by line
+    # through `progress`; `build_finished` carries (returncode, stdout, stderr).
+    progress = pyqtSignal(str)
+    build_finished = pyqtSignal(int, str, str)
+
+    def __init__(self, cmd, cwd=None, stdin_data=None, parent=None):
+        super().__init__(parent)
+        self.cmd = cmd
+        self.cwd = cwd
+        self.stdin_data = stdin_data
+        self.process = None
+        self.cancelled = False
+
+    def run(self):
+        try:
+            # gcc forks cc1/as/collect2; a session of its own lets cancel() kill them all
+            self.process = subprocess.Popen(
+                self.cmd,
+                cwd=self.cwd,
+                stdin=subprocess.DEVNULL if self.stdin_data is None else subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=(os.name == "posix")
+            )
+        except Exception as e:
+            self.build_finished.emit(-1, "", f"Failed to run {self.cmd[0]}:\n{e}")
+            return
+
+        if self.cancelled:
+            self.kill_process()
+
+        if self.stdin_data is not None:
+            stdin_writer = threading.Thread(target=self.write_stdin)
+            stdin_writer.daemon = True
+            stdin_writer.start()
+
+        stdout_chunks = []
+        stdout_reader = threading.Thread(target=lambda: stdout_chunks.append(self.process.stdout.read()))
+        stdout_reader.daemon = True
+        stdout_reader.start()
+
+        stderr_lines = []
+        for line in self.process.stderr:
+            stderr_lines.append(line)
+            self.progress.emit(line.rstrip("\n"))
+
+        self.process.wait()
+        stdout_reader.join()
+        self.build_finished.emit(self.process.returncode, "".join(stdout_chunks), "".join(stderr_lines))
+
+    def write_stdin(self):
+        try:
+            self.process.stdin.write(self.stdin_data)
+            self.process.stdin.close()
+        except OSError:
+            pass  # gcc exited or was killed before reading all of its input
+
+    def cancel(self):
+        self.cancelled = True
+        self.kill_process()
+
+    def kill_process(self):
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except OSError:
+            pass
+
+
+class BuildQueue(QObject):
+    # Runs many gcc commands with at most max_jobs at once. Mirrors BuildWorker's
+    # signals so MainWindow can track it like a single build; build_finished
+    # reports the number of failed jobs once every job is done.
+    progress = pyqtSignal(str)
+    build_finished = pyqtSignal(int, str, str)
+
+    def __init__(self, max_jobs=None, parent=None):
+        super().__init__(parent)
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        self.pending = deque()
+        self.running = set()
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.errors = []
+        self.cancelled = False
+
+    def submit(self, cmd, on_finished, cwd=None, stdin_data=None):
+        self.pending.append((cmd, on_finished, cwd, stdin_data))
+        self.total += 1
+
+    def start(self):
+        if not self.pending:
+            self.build_finished.emit(0, "", "")
+            return
+        self.start_next()
+
+    def start_next(self):
+        while self.pending and len(self.running) < self.max_jobs and not self.cancelled:
+            cmd, on_finished, cwd, stdin_data = self.pending.popleft()
+            # Parented to our owner, not to us: the queue may be deleted before a worker thread has fully exited
+            worker = BuildWorker(cmd, cwd=cwd, stdin_data=stdin_data, parent=self.parent())
+            worker.build_finished.connect(
+                lambda returncode, output, errors, worker=worker, on_finished=on_finished:
+                    self.on_job_finished(worker, returncode, output, errors, on_finished)
+            )
+            worker.finished.connect(worker.deleteLater)
+            self.running.add(worker)
+            worker.start()
+
+    def on_job_finished(self, worker, returncode, output, errors, on_finished):
+        self.running.discard(worker)
+        if self.cancelled:
+            return
+        self.done += 1
+        if returncode != 0:
+            self.failed += 1
+            self.errors.append(errors)
+        on_finished(returncode, output, errors)
+        self.progress.emit(f"{self.done}/{self.total} jobs done")
+
+        if self.pending:
+            self.start_next()
+        elif not self.running:
+            self.build_finished.emit(self.failed, "", "\n".join(self.errors))
+
+    def cancel(self):
+        # build_finished still comes, once, so owners can clean up; they tell
+        # a cancelled queue by its cancelled flag
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.pending.clear()
+        for worker in list(self.running):
+            worker.cancel()
+        self.build_finished.emit(self.failed, "", "\n".join(self.errors))
+
+    def wait(self):
+        for worker in list(self.running):
+            worker.wait()
+
+
+def find_ordered_passes(build_dir, kinds):
+    # Every build writes to its own directory, so any "NNN<kind>.<pass>" file there is ours
+    passes = []
+    for f in glob.glob(os.path.join(build_dir, "*")):
+        match = re.search(r"\.(\d+)([tir])\.([^.]+)$", f)
+        if match and match.group(2) in kinds:
+            passes.append((int(match.group(1)), match.group(3), f))
+    return sorted(passes, key=lambda x: x[0])
+
+def count_changed_lines(lines1, lines2):
+    if lines1 == lines2:
+        return 0, 0
+    added = removed = 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, lines1, lines2).get_opcodes():
+        if tag in ("replace", "delete"):
+            removed += i2 - i1
+        if tag in ("replace", "insert"):
+            added += j2 - j1
+    return added, removed
+
+def pass_change_stats(build_dir):
+    # {(pass number, pass name): (added, removed)} for one build; the first pass
+    # of each dump kind has nothing to compare against and maps to None
+    stats = {}
+    store = DumpStore()
+    for kind in "tr":
+        prev_lines = None
+        for num, name, path in find_ordered_passes(build_dir, kind):
+            lines = store.load(path)
+            stats[(num, name)] = None if prev_lines is None else count_changed_lines(prev_lines, lines)
+            prev_lines = lines
+    return stats
+
+def matrix_pass_stats(level_dirs, max_workers=None, cancelled=None):
+    # One process per optimization level so the diffing runs on every core.
+    # cancelled() is polled while they run; once it is true this returns None
+    # without waiting for the levels still being diffed.
+    levels = list(level_dirs)
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+    futures = [pool.submit(pass_change_stats, level_dirs[level]) for level in levels]
+    if cancelled is not None:
+        while concurrent.futures.wait(futures, timeout=0.1)[1]:
+            if cancelled():
+                for future in futures:
+                    future.cancel()
+                pool.shutdown(wait=False)
+                return None
+    with pool:
+        return dict(zip(levels, [future.result() for future in futures]))
+
+
+class FunctionWorker(QThread):
+    # Runs fn(*args) off the GUI thread and hands the result back through a signal.
+    # With with_progress, fn also gets progress=callable(done, total); with
+    # cancellable, cancelled=callable() that turns true once cancel() is called.
+    # A cancelled worker emits neither result_ready nor failed.
+    result_ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, fn, *args, parent=None, with_progress=False, cancellable=False):
+        super().__init__(parent)
+        self.fn = fn
+        self.args = args
+        self.kwargs = {"progress": self.progress.emit} if with_progress else {}
+        if cancellable:
+            self.kwargs["cancelled"] = lambda: self.cancelled
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.failed.emit(str(e))
+            return
+        if not self.cancelled:
+            self.result_ready.emit(result)
+
+# FunctionWorkers parented to the application because the window that started
+# them may be deleted before they finish; MainWindow cancels and waits for
+# them on exit, since Qt must never destroy a running thread
+DETACHED_WORKERS = set()
+
+def start_detached(worker):
+    DETACHED_WORKERS.add(worker)
+    worker.finished.connect(lambda: DETACHED_WORKERS.discard(worker))
+    worker.finished.connect(worker.deleteLater)
+    worker.start()
+
+
+class MatrixComparisonWindow(QDialog):
+    def __init__(self, levels, stats, failed_levels, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Optimization Level Build Matrix")
+        self.resize(1000, 700)
+
+        passes = sorted({key for level_stats in stats.values() for key in level_stats})
+
+        self.table = QTableWidget(len(passes), len(levels))
+        self.table.setHorizontalHeaderLabels(levels)
+        self.table.setVerticalHeaderLabels([f"{num:03d} {name}" for num, name in passes])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        for row, key in enumerate(passes):
+            for col, level in enumerate(levels):
+                level_stats = stats.get(level, {})
+                if key not in level_stats:
+                    item = QTableWidgetItem("")
+                    item.setBackground(QColor("#eeeeee"))
+                    item.setToolTip(f"{key[1]} did not run at {level}")
+                elif level_stats[key] is None:
+                    item = QTableWidgetItem("ran")
+                    item.setToolTip("First dump of its kind; nothing to compare against")
+                else:
+                    added, removed = level_stats[key]
+                    item = QTableWidgetItem(str(added + removed))
+                    item.setToolTip(f"+{added} / -{removed} lines")
+                    if added + removed:
+                        # Darker cells for passes that changed more
+                        shade = max(120, 255 - min(added + removed, 270) // 2)
+                        item.setBackground(QColor(255, shade, shade))
+                    else:
+                        item.setForeground(QColor("gray"))
+                item.setTextAlignment(Qt.AlignCenter)
+                self.table.setItem(row, col, item)
+
+        summary = "Cells show lines changed by each pass (vs. the previous dump of the same kind); grey = pass did not run."
+        if failed_levels:
+            summary += "\nBuild failed at: " + ", ".join(failed_levels)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(summary))
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+
+def generate_function_pass_diffs(passes, func_name):
+    # Like generate_pass_diffs, restricted to one function's section of each dump
+    return PassDiffs(consecutive_pairs(passes), func_name)
+
+def filter_tu_flags(args, source, directory):
+    # Keeps a translation unit's own flags (-I, -D, -std, -O, -f..., -m...) and drops
+    # everything that names outputs or the source, which the dump build sets itself
+    flags = []
+    skip_next = False
+    for arg in args:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg in ("-c", "-S", "-E", "-M", "-MM", "-MD", "-MMD", "-MP"):
+            continue
+        if arg in ("-o", "-MF", "-MT", "-MQ"):
+            skip_next = True
+            continue
+        if arg.startswith(("-o", "-MF", "-MT", "-MQ")):
+            continue
+        if not arg.startswith("-") and os.path.normpath(os.path.join(directory, arg)) == source:
+            continue
+        flags.append(arg)
+    return flags
+
+def load_compile_commands(path):
+    with open(path) as f:
+        entries = json.load(f)
+
+    units = []
+    for entry in entries:
+        directory = entry.get("directory") or os.path.dirname(os.path.abspath(path))
+        source = os.path.normpath(os.path.join(directory, entry["file"]))
+        if not source.endswith(".c"):
+            continue
+        args = entry["arguments"] if "arguments" in entry else shlex.split(entry.get("command", ""))
+        units.append({"file": source, "directory": directory, "flags": filter_tu_flags(args[1:], source, directory)})
+    return units
+
+def scan_project_dir(path):
+    units = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.endswith(".c"):
+                units.append({"file": os.path.join(root, name), "directory": path, "flags": []})
+    return units
+
+
+class ProjectWindow(QDialog):
+    MODES = [("GIMPLE", "gimple"), ("RTL", "rtl"), ("Unified (IPA + GIMPLE + RTL)", "all")]
+
+    def __init__(self, units, root, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Project: {root} ({len(units)} translation units)")
+        self.resize(700, 700)
+
+        self.units = units
+        self.build_dirs = {}
+        self.viewers = []  # open timelines and CFGs, which read this project's dumps
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Translation unit / function", "Status"])
+        for i, unit in enumerate(units):
+            item = QTreeWidgetItem([os.path.relpath(unit["file"], root), "pending"])
+            item.setData(0, Qt.UserRole, (i, None))
+            self.tree.addTopLevelItem(item)
+        self.tree.resizeColumnToContents(0)
+        self.tree.itemDoubleClicked.connect(lambda item, column: self.open_timeline())
+
+        self.mode_box = QComboBox()
+        for label, mode in self.MODES:
+            self.mode_box.addItem(label, mode)
+
+        timeline_button = QPushButton("Pass Timeline")
+        timeline_button.clicked.connect(self.open_timeline)
+        cfg_button = QPushButton("CFG")
+        cfg_button.clicked.connect(self.open_cfg)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.mode_box)
+        controls.addWidget(timeline_button)
+        controls.addWidget(cfg_button)
+
+        self.status_label = QLabel("Building...")
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.tree)
+        layout.addLayout(controls)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+    def set_cancelled(self):
+        for i in range(self.tree.topLevelItemCount()):
+            item = self.tree.topLevelItem(i)
+            if item.text(1) == "pending":
+                item.setText(1, "cancelled")
+        self.status_label.setText("Build cancelled.")
+
+    def set_unit_result(self, index, build_dir, returncode, errors):
+        item = self.tree.topLevelItem(index)
+        item.setText(1, "ok" if returncode == 0 else "failed")
+        item.setToolTip(1, errors.strip())
+        if returncode != 0:
+            item.setForeground(1, QColor("red"))
+            return
+
+        self.build_dirs[index] = build_dir
+        for func_name in self.function_names(build_dir):
+            child = QTreeWidgetItem([func_name, ""])
+            child.setData(0, Qt.UserRole, (index, func_name))
+            item.addChild(child)
+
+    def cfg_dump(self, build_dir):
+        for _, name, path in find_ordered_passes(build_dir, "t"):
+            if name == "cfg":
+                return path
+        return None
+
+    def function_names(self, build_dir):
+        path = self.cfg_dump(build_dir)
+        if path is None:
+            return []
+        with open(path) as f:
+            return list(extract_cfgs_per_function(f.read()))
+
+    def selection(self):
+        item = self.tree.currentItem()
+        if item is None:
+            return None, None, None
+        index, func_name = item.data(0, Qt.UserRole)
+        return self.build_dirs.get(index), index, func_name
+
+    def open_timeline(self):
+        build_dir, index, func_name = self.selection()
+        if build_dir is None:
+            QMessageBox.information(self, "Not Ready", "Select a translation unit that has been built successfully.")
+            return
+
+        mode = self.mode_box.currentData()
+        if mode == "all":
+            # Dumps are paired per kind here too, with or without a function
+            diffs = generate_unified_pass_diffs(find_unified_passes(build_dir), func_name=func_name)
+            viewer_class = UnifiedPassDiffTimeline
+        else:
+            passes = find_ordered_passes(build_dir, "t" if mode == "gimple" else "r")
+            viewer_class = GimplePassDiffTimeline if mode == "gimple" else RtlPassDiffTimeline
+            if func_name is not None:
+                diffs = generate_function_pass_diffs(passes, func_name)
+            else:
+                diffs = generate_pass_diffs(passes)
+
+        if not diffs:
+            QMessageBox.information(self, "No Dumps", "Need at least 2 dump files.")
+            return
+
+        viewer = viewer_class(diffs, self)
+        viewer.diff_workers = self.parent().diff_workers
+        unit_name = self.tree.topLevelItem(index).text(0)
+        viewer.setWindowTitle(f"{viewer.windowTitle()}: {unit_name}" + (f" / {func_name}" if func_name else ""))
+        self.track_viewer(viewer)
+        viewer.show()
+
+    def track_viewer(self, viewer):
+        viewer.setAttribute(Qt.WA_DeleteOnClose)
+        self.viewers.append(viewer)
+        viewer.destroyed.connect(lambda _=None, viewer=viewer: self.viewers.remove(viewer))
+
+    def closeEvent(self, event):
+        # The viewers are windows of their own; they must not outlive the dumps
+        for viewer in list(self.viewers):
+            viewer.close()
+        super().closeEvent(event)
+
+    def open_cfg(self):
+        build_dir, index, func_name = self.selection()
+        path = self.cfg_dump(build_dir) if build_dir else None
+        if path is None:
+            QMessageBox.information(self, "Not Ready", "Select a translation unit that has been built successfully.")
+            return
+
+        with open(path) as f:
+            per_func_cfgs = extract_cfgs_per_function(f.read())
+        if func_name is not None:
+            per_func_cfgs = {func_name: per_func_cfgs.get(func_name, "")}
+
+        viewer = TabbedCFGWindow(per_func_cfgs, self)
+        self.track_viewer(viewer)
+        viewer.show()
+
+
+PROFILE_REPORT_FILE = "compile-report.txt"
+
+def parse_size(value, unit=""):
+    value = value.strip()
+    scale = {"k": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    suffix = (value[-1:] if value[-1:] in scale else unit[:1])
+    number = value[:-1] if value[-1:] in scale else value
+    return int(float(number) * scale.get(suffix, 1))
+
+def parse_time_report(text):
+    # Returns (timevars, total) from -ftime-report output. Handles the column
+    # layout of gcc >= 9 ("usr sys wall GGC" header) and the older inline one
+    # ("0.01 ( 4%) usr ... 229 kB ( 3%) ggc").
+    records = []
+    total = None
+    new_style = re.compile(
+        r"^\s*(.+?)\s*:\s*([\d.]+)\s*\(\s*\d+%\)\s+([\d.]+)\s*\(\s*\d+%\)\s+([\d.]+)\s*\(\s*\d+%\)"
+        r"\s+([\d.]+[kMG]?)\s*\(\s*\d+%\)\s*$")
+    old_style = re.compile(
+        r"^\s*(.+?)\s*:\s*([\d.]+)\s*\(\s*\d+%\)\s*usr\s+([\d.]+)\s*\(\s*\d+%\)\s*sys\s+"
+        r"([\d.]+)\s*\(\s*\d+%\)\s*wall\s+([\d.]+)\s*(kB|MB|GB)?\s*\(\s*\d+%\)\s*ggc")
+    total_re = re.compile(r"^\s*TOTAL\s*:\s*([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+\s*[kMG]?B?)")
+
+    for line in text.splitlines():
+        match = total_re.match(line)
+        if match:
+            ggc = match.group(4).replace("B", "").replace(" ", "")
+            total = {"name": "TOTAL", "usr": float(match.group(1)), "sys": float(match.group(2)),
+                     "wall": float(match.group(3)), "ggc": parse_size(ggc)}
+            continue
+        match = new_style.match(line)
+        if match:
+            ggc = parse_size(match.group(5))
+        else:
+            match = old_style.match(line)
+            if not match:
+                continue
+            ggc = parse_size(match.group(5), match.group(6) or "")
+        name = match.group(1)
+        records.append({"name": name, "usr": float(match.group(2)), "sys": float(match.group(3)),
+                        "wall": float(match.group(4)), "ggc": ggc, "phase": name.startswith("phase ")})
+    return records, total
+
+def parse_mem_report_total(text):
+    # The "Total" row of -fmem-report's "Memory still allocated" table
+    match = re.search(r"^Total\s+([\d.]+[kMG]?)\s+([\d.]+[kMG]?)\s+([\d.]+[kMG]?)\s*$", text, re.M)
+    if not match:
+        return None
+    return {"allocated": parse_size(match.group(1)), "used": parse_size(match.group(2)),
+            "overhead": parse_size(match.group(3))}
+
+def profile_to_chrome_trace(records):
+    # gcc only reports totals per timevar, not timestamps, so events are laid
+    # end to end: phases on one track, individual timevars on another
+    events = []
+    for tid, phase in ((1, True), (2, False)):
+        ts = 0.0
+        for record in records:
+            if record["phase"] != phase:
+                continue
+            dur = record["wall"] * 1e6
+            events.append({"name": record["name"], "ph": "X", "pid": 1, "tid": tid, "ts": ts, "dur": dur,
+                           "args": {"usr": record["usr"], "sys": record["sys"], "ggc_bytes": record["ggc"]}})
+            ts += dur
+    events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "phases"}})
+    events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "passes"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "otherData": {"source": "gcc -ftime-report", "layout": "sequential totals"}}
+
+
+class ProfileWindow(QDialog):
+    COLUMNS = ["Pass / timevar", "Wall (s)", "User (s)", "Sys (s)", "GGC (kB)"]
+
+    def __init__(self, report_text, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("GCC Compile-Time Profile")
+        self.resize(800, 700)
+
+        self.records, self.total = parse_time_report(report_text)
+        passes = [r for r in self.records if not r["phase"]]
+
+        self.table = QTableWidget(len(passes), len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, record in enumerate(passes):
+            self.table.setItem(row, 0, QTableWidgetItem(record["name"]))
+            for col, value in enumerate((record["wall"], record["usr"], record["sys"], record["ggc"] / 1024.0), 1):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, round(value, 2))  # numeric role so sorting is numeric
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(1, Qt.DescendingOrder)
+        self.table.resizeColumnsToContents()
+
+        self.chart = ZoomableGraphicsView()
+        self.chart.setScene(self.build_chart(passes))
+
+        tabs = QTabWidget()
+        tabs.addTab(self.table, "Table")
+        tabs.addTab(self.chart, "Chart")
+
+        summary = "No -ftime-report data found in gcc's output."
+        if self.total:
+            summary = f"Total: {self.total['wall']:.2f}s wall, {self.total['usr']:.2f}s user, " \
+                      f"{self.total['sys']:.2f}s sys, {self.total['ggc'] // 1024} kB GGC"
+        mem = parse_mem_report_total(report_text)
+        if mem:
+            summary += f"  |  Memory still allocated: {mem['allocated'] // 1024} kB " \
+                       f"(used {mem['used'] // 1024} kB, overhead {mem['overhead'] // 1024} kB)"
+
+        export_button = QPushButton("Export Chrome Trace...")
+        export_button.clicked.connect(self.export_trace)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(summary))
+        layout.addWidget(tabs)
+        layout.addWidget(export_button)
+        self.setLayout(layout)
+
+    def build_chart(self, passes):
+        # Flame-style: one row of phases and one row of passes, each bar as wide as
+        # its wall time, then every pass ranked on its own bar below
+        scene = QGraphicsScene()
+        width = 1000.0
+        total_wall = sum(r["wall"] for r in passes) or 1.0
+        phase_wall = sum(r["wall"] for r in self.records if r["phase"]) or 1.0
+        font = QFont("Courier", 8)
+
+        def bar(x, y, w, h, record, color):
+            rect = scene.addRect(x, y, max(w, 0.5), h, QPen(QColor("white")), QBrush(color))
+            rect.setToolTip(f"{record['name']}: {record['wall']:.2f}s wall, {record['ggc'] // 1024} kB GGC")
+            if w > 60:
+                label = scene.addSimpleText(record["name"], font)
+                label.setPos(x + 2, y + 2)
+
+        x = 0.0
+        for i, record in enumerate(r for r in self.records if r["phase"]):
+            w = width * record["wall"] / phase_wall
+            bar(x, 0, w, 20, record, QColor.fromHsv(30 + (i * 25) % 60, 160, 240))
+            x += w
+
+        ranked = sorted(passes, key=lambda r: r["wall"], reverse=True)
+        x = 0.0
+        for i, record in enumerate(ranked):
+            w = width * record["wall"] / total_wall
+            bar(x, 24, w, 20, record, QColor.fromHsv((i * 37) % 60, 200, 250))
+            x += w
+
+        longest = ranked[0]["wall"] if ranked and ranked[0]["wall"] else 1.0
+        for i, record in enumerate(r for r in ranked if r["wall"] > 0):
+            y = 60 + i * 16
+            bar(250, y, (width - 250) * record["wall"] / longest, 14, record, QColor("#e8734a"))
+            label = scene.addSimpleText(f"{record['name'][:32]:32} {record['wall']:.2f}s", font)
+            label.setPos(0, y)
+        return scene
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "gcc-profile.json", "JSON Files (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w") as f:
+                json.dump(profile_to_chrome_trace(self.records), f, indent=1)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not export trace:\n{e}")
+
+
+REMARKS_FILE = "remarks.txt"
+# -fopt-info-all writes the readable remarks; the optimization record carries the
+# emitting pass and function, which the text format leaves out
+REMARK_FLAGS = [f"-fopt-info-all={REMARKS_FILE}", "-fsave-optimization-record"]
+
+# First matching optgroup of the emitting pass wins
+OPTGROUP_CATEGORIES = [
+    ("inline", "Inlining"),
+    ("vec", "Vectorization"),
+    ("loop", "Loop Optimizations"),
+    ("ipa", "Interprocedural"),
+    ("omp", "OpenMP"),
+]
+RECORD_KINDS = {"success": "optimized", "failure": "missed", "note": "note", "scope": "note"}
+
+def parse_opt_info(text):
+    # "file:line:col: optimized|missed|note: message"; the unlocated lines are
+    # free-form pass chatter and are skipped
+    remarks = []
+    for line in text.splitlines():
+        match = re.match(r"^(.*?):(\d+):(?:(\d+):)? (optimized|missed|note): (.*)$", line)
+        if match:
+            remarks.append({"kind": match.group(4), "file": match.group(1), "line": int(match.group(2)),
+                            "column": int(match.group(3) or 0), "message": match.group(5).strip(),
+                            "pass": None, "function": None, "category": "Uncategorized"})
+    return remarks
+
+def parse_optimization_record(data):
+    # data is the decoded [header, passes, records] of a .opt-record.json.gz
+    _, pass_tree, records = data
+    passes = {}
+    pending = list(pass_tree)
+    while pending:
+        entry = pending.pop()
+        passes[entry["id"]] = entry
+        pending.extend(entry.get("children", []))
+
+    # Passes that run more than once are dumped as "vrp1", "vrp2", ... in
+    # pipeline order, while the record names every instance "vrp": number the
+    # instances of each name (per IR type) the same way so remarks match dumps
+    instances = {}
+    for entry in passes.values():
+        instances.setdefault((entry.get("name"), entry.get("type")), set()).add(entry.get("num"))
+    labels = {}
+    for pass_id, entry in passes.items():
+        name = (entry.get("name") or "").lstrip("*")
+        nums = sorted(instances[(entry.get("name"), entry.get("type"))], key=lambda num: (num is None, num))
+        if name and len(nums) > 1:
+            name += str(nums.index(entry.get("num")) + 1)
+        labels[pass_id] = name or None
+
+    remarks = []
+    for record in records:
+        info = passes.get(record.get("pass"), {})
+        groups = info.get("optgroups", [])
+        category = next((label for group, label in OPTGROUP_CATEGORIES if group in groups), "Other")
+        message = "".join(
+            part if isinstance(part, str) else str(part.get("symtab_node") or part.get("expr") or part.get("stmt", ""))
+            for part in record.get("message", []))
+        location = record.get("location", {})
+        function = record.get("function")
+        if function is None and record.get("inlining_chain"):
+            function = record["inlining_chain"][0].get("fndecl")
+        remarks.append({"kind": RECORD_KINDS.get(record.get("kind"), record.get("kind")),
+                        "file": location.get("file", ""), "line": location.get("line", 0),
+                        "column": location.get("column", 0), "message": " ".join(message.split()),
+                        "pass": labels.get(record.get("pass")), "function": function,
+                        "category": category})
+    return remarks
+
+def load_remarks(build_dir):
+    # Prefers the optimization record; falls back to the -fopt-info text when the
+    # record is missing (gcc < 9) or unreadable
+    for path in glob.glob(os.path.join(build_dir, "*opt-record.json.gz")):
+        try:
+            with gzip.open(path, "rt") as f:
+                return RemarkIndex(parse_optimization_record(json.load(f)))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    for path in glob.glob(os.path.join(build_dir, "*" + REMARKS_FILE)):
+        with open(path) as f:
+            return RemarkIndex(parse_opt_info(f.read()))
+    return RemarkIndex()
+
+class RemarkIndex:
+    FIELDS = ("category", "function", "line", "kind", "pass")
+
+    def __init__(self, remarks=()):
+        self.remarks = list(remarks)
+        self.index = {field: {} for field in self.FIELDS}
+        for i, remark in enumerate(self.remarks):
+            for field in self.FIELDS:
+                self.index[field].setdefault(remark[field], []).append(i)
+
+    def __len__(self):
+        return len(self.remarks)
+
+    def values(self, field):
+        return sorted(value for value in self.index[field] if value is not None)
+
+    def filter(self, **criteria):
+        # e.g. filter(category="Inlining", line=12); None matches everything
+        selected = None
+        for field, value in criteria.items():
+            if value is None:
+                continue
+            ids = self.index[field].get(value, ())
+            selected = set(ids) if selected is None else selected.intersection(ids)
+        ids = range(len(self.remarks)) if selected is None else sorted(selected)
+        return [self.remarks[i] for i in ids]
+
+def format_remark(remark):
+    where = f"{remark['line']}:{remark['column']}" if remark["line"] else "-"
+    return f"{where}: {remark['kind']}: {remark['message']}"
+
+def remarks_html(remarks):
+    colors = {"optimized": "green", "missed": "red"}
+    lines = [f'<span style="color:{colors.get(r["kind"], "gray")};">{html_escape(format_remark(r))}</span>'
+             for r in remarks]
+    return "<pre>" + "\n".join(lines) + "</pre>"
+
+
+class RemarksWindow(QDialog):
+    COLUMNS = ["Line", "Kind", "Category", "Pass", "Function", "Message"]
+    line_activated = pyqtSignal(int)
+
+    def __init__(self, remarks, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Optimization Remarks")
+        self.resize(1000, 600)
+
+        self.category_combo = QComboBox()
+        self.function_combo = QComboBox()
+        self.kind_combo = QComboBox()
+        self.line_edit = QLineEdit()
+        self.line_edit.setPlaceholderText("Source line")
+        for combo in (self.category_combo, self.function_combo, self.kind_combo):
+            combo.currentIndexChanged.connect(self.apply_filter)
+        self.line_edit.textChanged.connect(self.apply_filter)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.cellDoubleClicked.connect(self.on_double_click)
+
+        filters = QHBoxLayout()
+        for label, widget in (("Category:", self.category_combo), ("Function:", self.function_combo),
+                              ("Kind:", self.kind_combo), ("Line:", self.line_edit)):
+            filters.addWidget(QLabel(label))
+            filters.addWidget(widget)
+
+        self.count_label = QLabel()
+        layout = QVBoxLayout()
+        layout.addLayout(filters)
+        layout.addWidget(self.table)
+        layout.addWidget(self.count_label)
+        self.setLayout(layout)
+
+        self.set_remarks(remarks)
+
+    def set_remarks(self, remarks):
+        # Keeps the current filters when a rebuild replaces the remarks
+        self.remarks = remarks
+        for combo, field in ((self.category_combo, "category"), (self.function_combo, "function"),
+                             (self.kind_combo, "kind")):
+            current = combo.currentText()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem("All")
+            combo.addItems(remarks.values(field))
+            combo.setCurrentIndex(max(combo.findText(current), 0))
+            combo.blockSignals(False)
+        self.apply_filter()
+
+    def apply_filter(self):
+        def choice(combo):
+            return None if combo.currentIndex() <= 0 else combo.currentText()
+
+        line = self.line_edit.text().strip()
+        shown = self.remarks.filter(category=choice(self.category_combo), function=choice(self.function_combo),
+                                    kind=choice(self.kind_combo), line=int(line) if line.isdigit() else None)
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(shown))
+        for row, remark in enumerate(shown):
+            values = (remark["line"], remark["kind"], remark["category"], remark["pass"] or "",
+                      remark["function"] or "", remark["message"])
+            for col, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                if col == 1 and value in ("optimized", "missed"):
+                    item.setForeground(QColor("green" if value == "optimized" else "red"))
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+        self.count_label.setText(f"{len(shown)} of {len(self.remarks)} remarks")
+
+    def on_double_click(self, row, column):
+        line = self.table.item(row, 0).data(Qt.DisplayRole)
+        if line:
+            self.line_activated.emit(int(line))
+
+
+_compiler_versions = {}
+
+def compiler_version(compiler="gcc"):
+    if compiler not in _compiler_versions:
+        try:
+            process = subprocess.run([compiler, "--version"], stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, text=True)
+            _compiler_versions[compiler] = process.stdout
+        except Exception:
+            _compiler_versions[compiler] = ""
+    return _compiler_versions[compiler]
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "compilersupport", "dumps")
+
+
+class DumpCache:
+    # On-disk cache of dump sets, one directory per key. Entries are published
+    # with an atomic rename and evicted by renaming them away first, so several
+    # instances can share the same root without a lock file. The entry mtime is
+    # the LRU clock.
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, root=None, max_bytes=1024 * 1024 * 1024):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def make_key(preprocessed_source, flags, version):
+        h = hashlib.sha256()
+        for part in (version, "\0".join(flags), preprocessed_source):
+            h.update(part.encode("utf-8", "surrogateescape"))
+            h.update(b"\0\0")
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def lookup(self, key, dest_dir, prefix="dump."):
+        entry = self.entry_path(key)
+        try:
+            names = os.listdir(entry)
+            os.utime(entry)
+        except OSError:
+            return None
+
+        materialized = []
+        try:
+            for name in names:
+                dst = os.path.join(dest_dir, prefix + name)
+                if os.path.exists(dst):
+                    os.remove(dst)
+                try:
+                    os.link(os.path.join(entry, name), dst)
+                except OSError:
+                    shutil.copy2(os.path.join(entry, name), dst)
+                materialized.append(dst)
+        except OSError:
+            # Evicted by another instance while we were reading it
+            for path in materialized:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return None
+        return materialized
+
+    def store(self, key, dump_files):
+        if not dump_files:
+            return
+        tmp = os.path.join(self.root, f"tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp)
+            for path in dump_files:
+                # Keep only the "NNNt.pass" part; the prefix depends on the output name
+                match = re.search(r"\.(\d+[tir]\.[^.]+|opt-record\.json\.gz)$|(remarks\.txt)$", path)
+                if match:
+                    # Build dirs are never written again, so the entry can share their files
+                    dst = os.path.join(tmp, match.group(1) or match.group(2))
+                    try:
+                        os.link(path, dst)
+                    except OSError:
+                        shutil.copy2(path, dst)
+            os.rename(tmp, self.entry_path(key))
+        except OSError:
+            # Another instance published the same key first (or the disk is full)
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
 
+    def entries(self):
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.is_dir() and not entry.name.startswith("tmp-"):
+                        entries.append(entry)
+        except OSError:
+            pass
+        return entries
+
+    def entry_size(self, path):
+        total = 0
+        try:
+            with os.scandir(path) as it:
+                for f in it:
+                    total += f.stat().st_size
+        except OSError:
+            pass
+        return total
+
+    def remove_entry(self, path):
+        doomed = os.path.join(self.root, f"tmp-{uuid.uuid4().hex}")
+        try:
+            os.rename(path, doomed)
+        except OSError:
+            return  # already gone
+        shutil.rmtree(doomed, ignore_errors=True)
+
+    def evict(self):
+        sized = []
+        for entry in self.entries():
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            sized.append((mtime, self.entry_size(entry.path), entry.path))
+
+        total = sum(size for _, size, _ in sized)
+        for _, size, path in sorted(sized):
+            if total <= self.max_bytes:
+                break
+            self.remove_entry(path)
+            total -= size
+
+        # Leftovers of instances that died mid-store
+        now = time.time()
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.startswith("tmp-") and now - entry.stat().st_mtime > self.STALE_TMP_SECONDS:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+    def clear(self):
+        for entry in self.entries():
+            self.remove_entry(entry.path)
 
 
 class MainWindow(QMainWindow):
+    KEEP_BUILD_DIRS = 4
+    LIVE_REBUILD_DELAY_MS = 800
+
     def __init__(self):
         super().__init__()
         self.temp_dir = tempfile.TemporaryDirectory()
@@ -515,7 +3135,44 @@ class MainWindow(QMainWindow):
         self.highlighter = CSyntaxHighlighter(self.text_edit.document())
         self.optimization_level = "-O2"  # default optimization level
 
+        self.build_worker = None
+        self.build_timer = QElapsedTimer()
+        self.build_ticker = QTimer(self)
+        self.build_ticker.setInterval(200)
+        self.build_ticker.timeout.connect(self.update_build_status)
+        self.last_build_line = ""
+        self.dump_only = True
+        self.build_dirs = []
+        self.last_builds = {}  # build kind -> (build signature, result) of its last completed run
+        self.cfg_viewer = None
+        self.profile_window = None
+        self.project_window = None
+        self.project_dir = None
+        self.project_queue = None
+        self.timeline_viewers = {}  # mode -> open pass timeline
+        self.timeline_dirs = {}  # mode -> build dir its dumps are read from, on demand
+        self.diff_workers = None  # processes for matrix stats and diff exports; None = one per core
+        self.dump_store = (None, None)  # (build dir, DumpStore) shared by that build's timelines
+        self.live_view = None  # "cfg" or a timeline mode: the view live rebuilds refresh
+
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(self.LIVE_REBUILD_DELAY_MS)
+        self.live_timer.timeout.connect(self.live_rebuild)
+        self.text_edit.textChanged.connect(self.on_text_changed)
+
+        self.cache_workers = set()  # FunctionWorkers storing dumps into the cache
+        cache_error = None
+        try:
+            self.dump_cache = DumpCache()
+        except OSError as e:
+            cache_error = e
+            self.dump_cache = None
+
         self.create_menu()
+        self.create_status_bar()
+        if cache_error is not None:
+            self.build_status_label.setText(f"Dump cache disabled: {cache_error}")
 
     def create_menu(self):
         menubar = self.menuBar()
@@ -533,6 +3190,16 @@ class MainWindow(QMainWindow):
         saveas_action.triggered.connect(self.save_as_file)
         file_menu.addAction(saveas_action)
 
+        file_menu.addSeparator()
+
+        open_project_action = QAction("Open Project (compile_commands.json)...", self)
+        open_project_action.triggered.connect(self.open_project)
+        file_menu.addAction(open_project_action)
+
+        open_project_dir_action = QAction("Open Project Directory...", self)
+        open_project_dir_action.triggered.connect(self.open_project_dir)
+        file_menu.addAction(open_project_dir_action)
+
         # Build menu
         build_menu = menubar.addMenu("Build")
 
@@ -546,6 +3213,19 @@ class MainWindow(QMainWindow):
         build_cfg_action.triggered.connect(self.build_with_cfg)
         build_menu.addAction(build_cfg_action)
 
+        self.live_action = QAction("Live Rebuild", self, checkable=True)
+        self.live_action.setShortcut("Ctrl+L")
+        self.live_action.toggled.connect(self.set_live_rebuild)
+        build_menu.addAction(self.live_action)
+
+        self.profile_action = QAction("Collect Compile-Time Profile (-ftime-report)", self, checkable=True)
+        build_menu.addAction(self.profile_action)
+
+        dump_only_action = QAction("Dump Only (Skip Assemble and Link)", self, checkable=True)
+        dump_only_action.setChecked(self.dump_only)
+        dump_only_action.toggled.connect(self.set_dump_only)
+        build_menu.addAction(dump_only_action)
+
                 # Optimization Level menu
         opt_menu = menubar.addMenu("Optimization Level")
 
@@ -577,68 +3257,290 @@ class MainWindow(QMainWindow):
         rtl_action.triggered.connect(lambda: self.build_and_show_optimizations(mode="rtl"))
         optimizations_menu.addAction(rtl_action)
 
-    def build_only(self):
-        if not self.current_file:
-            QMessageBox.warning(self, "Warning", "Please open or save a C file first.")
+        unified_action = QAction("Unified Timeline (IPA + GIMPLE + RTL)", self)
+        unified_action.triggered.connect(lambda: self.build_and_show_optimizations(mode="all"))
+        optimizations_menu.addAction(unified_action)
+
+        remarks_action = QAction("Optimization Remarks (-fopt-info)", self)
+        remarks_action.triggered.connect(lambda: self.build_and_show_optimizations(mode="remarks"))
+        optimizations_menu.addAction(remarks_action)
+
+        optimizations_menu.addSeparator()
+
+        selected_gimple_action = QAction("Selected GIMPLE Passes...", self)
+        selected_gimple_action.triggered.connect(lambda: self.build_selected_passes(mode="gimple"))
+        optimizations_menu.addAction(selected_gimple_action)
+
+        selected_rtl_action = QAction("Selected RTL Passes...", self)
+        selected_rtl_action.triggered.connect(lambda: self.build_selected_passes(mode="rtl"))
+        optimizations_menu.addAction(selected_rtl_action)
+
+        workers_menu = build_menu.addMenu("Diff Worker Processes")
+        self.diff_workers_group = {}
+
+        def set_diff_workers(count):
+            def setter():
+                self.diff_workers = count
+                for value, action in self.diff_workers_group.items():
+                    action.setChecked(value == count)
+            return setter
+
+        for count in [None, 1, 2, 4, 8]:
+            action = QAction(f"Auto ({os.cpu_count()} cores)" if count is None else str(count), self, checkable=True)
+            action.setChecked(count == self.diff_workers)
+            action.triggered.connect(set_diff_workers(count))
+            workers_menu.addAction(action)
+            self.diff_workers_group[count] = action
+
+        matrix_action = QAction("Build Matrix (All Optimization Levels)", self)
+        matrix_action.setShortcut("Ctrl+Shift+M")
+        matrix_action.triggered.connect(self.build_matrix)
+        build_menu.addAction(matrix_action)
+
+        build_menu.addSeparator()
+        self.cancel_build_action = QAction("Cancel Build", self)
+        self.cancel_build_action.setShortcut("Esc")
+        self.cancel_build_action.setEnabled(False)
+        self.cancel_build_action.triggered.connect(self.cancel_build)
+        build_menu.addAction(self.cancel_build_action)
+
+        clear_cache_action = QAction("Clear Dump Cache", self)
+        clear_cache_action.triggered.connect(self.clear_dump_cache)
+        build_menu.addAction(clear_cache_action)
+
+    def create_status_bar(self):
+        status = self.statusBar()
+        self.build_status_label = QLabel("Ready")
+        status.addWidget(self.build_status_label, 1)
+
+        self.build_progress = QProgressBar()
+        self.build_progress.setRange(0, 0)  # busy indicator, gcc reports no percentage
+        self.build_progress.setMaximumWidth(150)
+        self.build_progress.hide()
+        status.addPermanentWidget(self.build_progress)
+
+        self.cancel_build_button = QPushButton("Cancel")
+        self.cancel_build_button.clicked.connect(self.cancel_build)
+        self.cancel_build_button.hide()
+        status.addPermanentWidget(self.cancel_build_button)
+
+    def start_build(self, cmd, on_finished, cwd=None, stdin_data=None):
+        worker = BuildWorker(cmd, cwd=cwd, stdin_data=stdin_data, parent=self)
+        worker.finished.connect(worker.deleteLater)
+        self.run_build_job(worker, on_finished)
+
+    def start_build_queue(self, queue, on_finished):
+        queue.build_finished.connect(queue.deleteLater)
+        self.run_build_job(queue, on_finished)
+
+    def run_build_job(self, worker, on_finished):
+        # Only one build runs at a time; a new request replaces the running one
+        self.cancel_build()
+
+        worker.progress.connect(self.on_build_progress)
+        worker.build_finished.connect(
+            lambda returncode, output, errors: self.on_build_finished(worker, returncode, output, errors, on_finished)
+        )
+        self.build_worker = worker
+
+        self.last_build_line = ""
+        self.build_timer.start()
+        self.build_ticker.start()
+        self.build_progress.show()
+        self.cancel_build_button.show()
+        self.cancel_build_action.setEnabled(True)
+        self.update_build_status()
+
+        worker.start()
+
+    def cancel_build(self):
+        worker = self.build_worker
+        if worker is None:
             return
+        self.build_worker = None
+        worker.cancel()
+        self.finish_build_status("Build cancelled.")
+
+    def on_build_progress(self, line):
+        if line.strip():
+            self.last_build_line = line.strip()
+            self.update_build_status()
+
+    def update_build_status(self):
+        elapsed = self.build_timer.elapsed() / 1000.0
+        message = f"Building... {elapsed:.1f}s"
+        if self.last_build_line:
+            message += f"  |  {self.last_build_line}"
+        self.build_status_label.setText(message)
+
+    def finish_build_status(self, message):
+        self.build_ticker.stop()
+        self.build_progress.hide()
+        self.cancel_build_button.hide()
+        self.cancel_build_action.setEnabled(False)
+        self.build_status_label.setText(message)
+
+    def on_build_finished(self, worker, returncode, output, errors, on_finished):
+        if worker is not self.build_worker or worker.cancelled:
+            return  # superseded or cancelled; its results are stale
+        self.build_worker = None
+        elapsed = self.build_timer.elapsed() / 1000.0
+        state = "finished" if returncode == 0 else "failed"
+        self.finish_build_status(f"Build {state} in {elapsed:.1f}s.")
+        on_finished(returncode, output, errors)
 
-        try:
-            with open(self.current_file, 'w') as file:
-                file.write(self.text_edit.toPlainText())
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not save before build:\n{e}")
+    def closeEvent(self, event):
+        self.cancel_build()
+        self.cancel_project_build()
+        # Killing gcc ends the build threads, but they (and superseded builds,
+        # cache stores, matrix comparisons) are children of this window and
+        # must finish before Qt destroys them with it; so must the workers of
+        # timelines and exports, which belong to the application
+        for worker in list(DETACHED_WORKERS):
+            worker.cancel()
+        for thread in self.findChildren(QThread) + list(DETACHED_WORKERS):
+            thread.wait()
+        event.accept()
+
+    def set_live_rebuild(self, enabled):
+        if enabled:
+            self.live_timer.start()
+        else:
+            self.live_timer.stop()
+
+    def on_text_changed(self):
+        if not self.live_action.isChecked():
             return
+        # Still typing: whatever gcc is compiling is already stale
+        self.cancel_build()
+        self.live_timer.start()
+
+    def live_rebuild(self):
+        target = self.live_view
+        if target == "cfg" and self.cfg_viewer is not None and self.cfg_viewer.isVisible():
+            self.build_with_cfg(live=True)
+        elif target in self.timeline_viewers and self.timeline_viewers[target].isVisible():
+            self.build_and_show_optimizations(target, live=True)
+        else:
+            self.check_syntax()
 
-        cmd = ['gcc', self.current_file, self.optimization_level, '-o', os.path.join(self.temp_path, 'a.out')]
+    def check_syntax(self):
+        cmd = ["gcc"] + self.source_args() + [self.optimization_level, "-fsyntax-only"]
 
-        try:
-            process = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            if process.returncode == 0:
-                QMessageBox.information(self, "Build Success", "Compiled successfully!")
+        def on_finished(returncode, output, errors):
+            if returncode == 0:
+                self.build_status_label.setText("Live: no errors.")
             else:
-                QMessageBox.critical(self, "Build Failed", f"Errors:\n{process.stderr}")
+                first_error = next((l for l in errors.splitlines() if "error" in l), errors.strip())
+                self.build_status_label.setText(f"Live: {first_error}")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"GCC execution failed:\n{e}")
+        self.start_build(cmd, on_finished, stdin_data=self.text_edit.toPlainText())
 
-    def build_with_cfg(self):
-        if not self.current_file:
-            QMessageBox.warning(self, "Warning", "Please open or save a C file first.")
+    def notify(self, live, box, title, text):
+        # Live rebuilds report to the status bar instead of interrupting typing with dialogs
+        if live:
+            self.build_status_label.setText(f"{title}: {text.splitlines()[0] if text else ''}")
+        else:
+            box(self, title, text)
+
+    def source_args(self):
+        # The editor buffer goes to gcc on stdin, so builds never touch the user's
+        # file and work for unsaved code. Quoted includes still resolve next to it.
+        args = ["-x", "c", "-"]
+        if self.current_file:
+            args += ["-iquote", os.path.dirname(os.path.abspath(self.current_file))]
+        return args
+
+    def build_signature(self, source, *flags):
+        return (hashlib.sha256(source.encode("utf-8")).hexdigest(), tuple(self.source_args()), flags, self.dump_only)
+
+    def set_dump_only(self, enabled):
+        self.dump_only = enabled
+
+    def new_build_dir(self):
+        build_dir = tempfile.mkdtemp(prefix="build-", dir=self.temp_path)
+        self.build_dirs.append(build_dir)
+        # Viewers only ever show the most recent builds, but open timelines read
+        # their dumps lazily and keep their directory alive
+        in_use = set(d for mode, d in self.timeline_dirs.items()
+                     if mode in self.timeline_viewers and self.timeline_viewers[mode].isVisible())
+        stale = [d for d in self.build_dirs[:-1] if d not in in_use]
+        while len(self.build_dirs) > self.KEEP_BUILD_DIRS and stale:
+            doomed = stale.pop(0)
+            self.build_dirs.remove(doomed)
+            shutil.rmtree(doomed, ignore_errors=True)
+        return build_dir
+
+    def output_flags(self, build_dir):
+        # Dump-only builds stop after generating assembly: no assembler, no linker, no main() needed
+        if self.dump_only:
+            return ["-S", "-o", os.path.join(build_dir, "out.s")]
+        return ["-o", os.path.join(build_dir, "a.out")]
+
+    def store_in_cache(self, key, files):
+        # Linking is quick, but the cache may be on another file system, where
+        # store() falls back to copying; either way it stays off the GUI thread
+        worker = FunctionWorker(self.dump_cache.store, key, files, parent=self)
+        self.cache_workers.add(worker)
+        worker.finished.connect(lambda: self.cache_workers.discard(worker))
+        worker.finished.connect(worker.deleteLater)
+        worker.start()
+
+    def clear_dump_cache(self):
+        if self.dump_cache is None:
             return
+        self.dump_cache.clear()
+        self.build_status_label.setText("Dump cache cleared.")
 
-        try:
-            with open(self.current_file, 'w') as file:
-                file.write(self.text_edit.toPlainText())
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not save before build:\n{e}")
+    def build_only(self):
+        source = self.text_edit.toPlainText()
+        cmd = ['gcc'] + self.source_args() + [self.optimization_level, '-o', os.path.join(self.temp_path, 'a.out')]
+        signature = self.build_signature(source, "build", self.optimization_level)
+
+        def on_finished(returncode, output, errors, skipped=False):
+            self.last_builds["build"] = (signature, (returncode, output, errors))
+            note = "\n(Buffer unchanged since the last build; gcc was not rerun.)" if skipped else ""
+            if returncode == 0:
+                QMessageBox.information(self, "Build Success", "Compiled successfully!" + note)
+            else:
+                QMessageBox.critical(self, "Build Failed", f"Errors:\n{errors}{note}")
+
+        last = self.last_builds.get("build")
+        if last is not None and last[0] == signature:
+            on_finished(*last[1], skipped=True)
             return
 
-        cmd = ['gcc', self.current_file, self.optimization_level, '-fdump-tree-cfg', '-o', os.path.join(self.temp_path, 'a.out')]
+        self.start_build(cmd, on_finished, stdin_data=source)
 
-        try:
-            process = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            output = process.stdout
-            error = process.stderr
+    def build_with_cfg(self, live=False):
+        source = self.text_edit.toPlainText()
+        signature = self.build_signature(source, "cfg", self.optimization_level)
+        last = self.last_builds.get("cfg")
+        if last is not None and last[0] == signature and os.path.isdir(last[1]):
+            self.show_cfg_result(last[1], 0, "", live)
+            return
+
+        build_dir = self.new_build_dir()
+        cmd = ['gcc'] + self.source_args() + [self.optimization_level, '-fdump-tree-cfg'] + self.output_flags(build_dir)
 
-            if process.returncode == 0:
-                QMessageBox.information(self, "Build Success", "Compilation succeeded!")
+        def on_finished(returncode, output, errors):
+            if returncode == 0:
+                self.last_builds["cfg"] = (signature, build_dir)
+                if not live:
+                    QMessageBox.information(self, "Build Success", "Compilation succeeded!")
+            self.show_cfg_result(build_dir, returncode, errors, live)
+
+        self.start_build(cmd, on_finished, cwd=build_dir, stdin_data=source)
+
+    def show_cfg_result(self, build_dir, returncode, error, live=False):
+        try:
+            if returncode == 0:
 
                 
-                base = os.path.basename(self.current_file)
-                pattern = os.path.join(self.temp_path, f"a-{base}.*.cfg")
+                pattern = os.path.join(build_dir, "*.cfg")
                 files = glob.glob(pattern)
                 if not files:
-                    QMessageBox.warning(self, "Warning", "No CFG dump file found.")
+                    self.notify(live, QMessageBox.warning, "Warning", "No CFG dump file found.")
                     return
 
                 cfg_file = files[-1]
@@ -652,25 +3554,24 @@ class MainWindow(QMainWindow):
 
                 per_func_cfgs = extract_cfgs_per_function(cfg_text)
                 if not per_func_cfgs:
-                    QMessageBox.warning(self, "No CFGs", "Could not extract any functions.")
+                    self.notify(live, QMessageBox.warning, "No CFGs", "Could not extract any functions.")
                     return
 
-                cfg_tabbed_window = TabbedCFGWindow(per_func_cfgs, parent=self)
-                cfg_tabbed_window.exec_()
-
-
-                for fpath in files:
-                    try:
-                        os.remove(fpath)
-                    except Exception as e:
-                        print(f"Warning: Could not remove CFG dump file {fpath}: {e}")
+                if self.cfg_viewer is not None and self.cfg_viewer.isVisible():
+                    self.cfg_viewer.set_cfgs(per_func_cfgs)
+                else:
+                    self.cfg_viewer = TabbedCFGWindow(per_func_cfgs, parent=self)
+                    self.cfg_viewer.show()
+                if not live:
+                    self.cfg_viewer.raise_()
+                self.live_view = "cfg"
 
 
             else:
-                QMessageBox.critical(self, "Build Failed", f"Errors:\n{error}")
+                self.notify(live, QMessageBox.critical, "Build Failed", f"Errors:\n{error}")
 
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to run gcc:\n{e}")
+            self.notify(live, QMessageBox.critical, "Error", f"Failed to display CFG:\n{e}")
 
 
     def open_file(self):
@@ -689,6 +3590,94 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not open file:\n{e}")
 
+    def open_project(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Open Compilation Database",
+            "",
+            "Compilation Database (compile_commands.json);;JSON Files (*.json);;All Files (*)"
+        )
+        if path:
+            try:
+                units = load_compile_commands(path)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Could not read compilation database:\n{e}")
+                return
+            self.build_project(units, os.path.dirname(os.path.abspath(path)))
+
+    def open_project_dir(self):
+        path = QFileDialog.getExistingDirectory(self, "Open Project Directory")
+        if not path:
+            return
+        database = os.path.join(path, "compile_commands.json")
+        try:
+            units = load_compile_commands(database) if os.path.exists(database) else scan_project_dir(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not read project:\n{e}")
+            return
+        self.build_project(units, path)
+
+    def build_project(self, units, root):
+        if not units:
+            QMessageBox.warning(self, "Empty Project", "No C translation units found.")
+            return
+
+        # Project dumps live outside the rotating per-build directories, since
+        # the project window keeps browsing them while other builds run. The old
+        # project's build stops and its window (and with it its viewers) closes
+        # before its dumps go.
+        self.cancel_project_build()
+        if self.project_window is not None:
+            self.project_window.close()
+        if self.project_dir is not None:
+            shutil.rmtree(self.project_dir, ignore_errors=True)
+        self.project_dir = tempfile.mkdtemp(prefix="project-", dir=self.temp_path)
+
+        window = ProjectWindow(units, root, self)
+        self.project_window = window
+
+        # Not in the single build slot: edits, live rebuilds and other views
+        # keep building while the project does
+        queue = BuildQueue(parent=self)
+        for i, unit in enumerate(units):
+            tu_dir = os.path.join(self.project_dir, f"tu{i:04d}")
+            os.makedirs(tu_dir)
+            flags = list(unit["flags"])
+            if not any(flag.startswith("-O") for flag in flags):
+                flags.append(self.optimization_level)
+            cmd = ["gcc"] + flags + [unit["file"], "-fdump-tree-all", "-fdump-ipa-all", "-fdump-rtl-all",
+                                     "-S", "-o", os.path.join(tu_dir, "out.s")]
+            queue.submit(
+                cmd,
+                lambda returncode, output, errors, i=i, tu_dir=tu_dir: window.set_unit_result(i, tu_dir, returncode, errors),
+                cwd=unit["directory"]
+            )
+
+        def on_project_built(failures, output, errors):
+            if self.project_queue is queue:
+                self.project_queue = None
+            if queue.cancelled:
+                window.set_cancelled()
+                return
+            message = f"Project built: {len(units) - failures} of {len(units)} translation units succeeded."
+            window.status_label.setText(message)
+            self.build_status_label.setText(message)
+
+        queue.progress.connect(lambda line: window.status_label.setText(f"Building... {line}"))
+        queue.build_finished.connect(on_project_built)
+        queue.build_finished.connect(queue.deleteLater)
+        self.project_queue = queue
+        window.show()
+        queue.start()
+
+    def cancel_project_build(self):
+        # Waits for gcc to die, so nothing writes into the project's dumps afterwards
+        queue = self.project_queue
+        if queue is None:
+            return
+        queue.cancel()
+        queue.wait()
+
     def save_as_file(self):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
@@ -706,42 +3695,90 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not save file:\n{e}")
 
-    def build_and_show_optimizations(self, mode):
-        if not self.current_file:
-            QMessageBox.warning(self, "Warning", "Please open or save a C file first.")
+    def build_and_show_optimizations(self, mode, live=False):
+        source = self.text_edit.toPlainText()
+        # One build dumps every tree, IPA and RTL pass plus gcc's optimization remarks;
+        # the GIMPLE, RTL, unified and remarks views all read the same build, so
+        # switching views never recompiles
+        flags = [self.optimization_level, "-fdump-tree-all", "-fdump-ipa-all", "-fdump-rtl-all"] + REMARK_FLAGS
+        if self.profile_action.isChecked():
+            flags += ["-ftime-report", "-fmem-report"]
+
+        signature = self.build_signature(source, *flags)
+        last = self.last_builds.get("dumps")
+        if last is not None and last[0] == signature and os.path.isdir(last[1]):
+            self.show_optimizations_result(mode, last[1], live)
             return
 
-        try:
-            with open(self.current_file, 'w') as file:
-                file.write(self.text_edit.toPlainText())
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not save before build:\n{e}")
-            return
+        build_dir = self.new_build_dir()
+        cmd = ["gcc"] + self.source_args() + flags + self.output_flags(build_dir)
+        # The output path is per build; only whether we stop at -S affects the dumps
+        key_flags = flags + (["-S"] if self.dump_only else [])
 
-        base = os.path.splitext(os.path.basename(self.current_file))[0]
-        cmd = ["gcc", self.current_file, self.optimization_level ]  # Enable optimizations
+        def show_result():
+            self.last_builds["dumps"] = (signature, build_dir)
+            self.show_optimizations_result(mode, build_dir, live)
 
-        # Append dump flags
-        if mode == "gimple":
-            cmd += ["-fdump-tree-all"]
-            dump_ext = "*t.*"
-        elif mode == "rtl":
-            cmd += ["-fdump-rtl-all"]
-            dump_ext = "*r.*"
+        def on_failed(errors):
+            # A failed build is not recorded, so the next request compiles again
+            self.notify(live, QMessageBox.critical, "Build Failed", f"Errors:\n{errors}")
 
+        def on_compiled(returncode, output, errors):
+            if returncode != 0:
+                on_failed(errors)
+                return
+            if self.dump_cache is not None:
+                dump_files = [path for _, _, path in self.get_ordered_passes(build_dir, "tir")]
+                remark_files = glob.glob(os.path.join(build_dir, "*opt-record.json.gz"))
+                remark_files += glob.glob(os.path.join(build_dir, REMARKS_FILE))
+                self.store_in_cache(key, dump_files + remark_files)
+            show_result()
+
+        def on_profiled(returncode, output, errors):
+            if returncode != 0:
+                on_failed(errors)
+                return
+            with open(os.path.join(build_dir, PROFILE_REPORT_FILE), "w") as f:
+                f.write(errors)
+            show_result()
+
+        def on_preprocessed(returncode, output, errors):
+            nonlocal key
+            if returncode != 0:
+                on_failed(errors)
+                return
 
+            key = DumpCache.make_key(output, key_flags, compiler_version("gcc"))
+            cached = self.dump_cache.lookup(key, build_dir)
+            if cached:
+                self.build_status_label.setText(f"Loaded {len(cached)} dumps from cache.")
+                show_result()
+                return
+            self.start_build(cmd, on_compiled, cwd=build_dir, stdin_data=source)
 
+        if self.profile_action.isChecked():
+            # Timings describe this run, so profiling builds never come from the cache
+            self.start_build(cmd, on_profiled, cwd=build_dir, stdin_data=source)
+            return
 
+        if self.dump_cache is None:
+            self.start_build(cmd, on_compiled, cwd=build_dir, stdin_data=source)
+            return
+
+        key = None
+        self.start_build(["gcc", "-E"] + self.source_args() + [self.optimization_level], on_preprocessed,
+                         cwd=build_dir, stdin_data=source)
+
+    def show_optimizations_result(self, mode, build_dir, live=False):
         try:
-            subprocess.run(cmd,cwd=self.temp_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if mode == "remarks":
+                self.show_remarks(load_remarks(build_dir), live)
+                return
 
-            # Pattern to find dump files
-            pattern = os.path.join(self.temp_path, f"a-{base}.c.{dump_ext}")
-            # print(f"Looking for dump files with pattern: {pattern}")
-            dump_files = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+            dump_files = self.get_ordered_passes(build_dir, {"gimple": "t", "rtl": "r", "all": "tir"}[mode])
 
             if not dump_files:
-                QMessageBox.information(self, "No Dumps", f"No {mode.upper()} optimization dumps found.")
+                self.notify(live, QMessageBox.information, "No Dumps", f"No {mode.upper()} optimization dumps found.")
                 return
 
             # Let user pick a dump file to view
@@ -758,14 +3795,13 @@ class MainWindow(QMainWindow):
             #     viewer = GimpleDiffViewer(file_a, file_b, parent=self)
             #     viewer.exec_()
             if mode == "gimple":
-                passes = self.get_ordered_gimple_passes(base)
+                passes = self.get_ordered_gimple_passes(build_dir)
                 if len(passes) < 2:
-                    QMessageBox.warning(self, "Not Enough Dumps", "Need at least 2 GIMPLE dump files.")
+                    self.notify(live, QMessageBox.warning, "Not Enough Dumps", "Need at least 2 GIMPLE dump files.")
                     return
 
-                diffs = generate_pass_diffs(passes)
-                viewer = GimplePassDiffTimeline(diffs, self)
-                viewer.exec_()
+                diffs = generate_pass_diffs(passes, self.store_for(build_dir))
+                self.show_timeline(mode, GimplePassDiffTimeline, diffs, live, build_dir)
 
 
             # if mode == "rtl":
@@ -785,44 +3821,228 @@ class MainWindow(QMainWindow):
             #     viewer = RtlDiffViewer(f1, f2, self)
             #     viewer.exec_()
             if mode == "rtl":    
-                passes = self.get_ordered_rtl_passes(base)
+                passes = self.get_ordered_rtl_passes(build_dir)
                 if len(passes) < 2:
-                    QMessageBox.warning(self, "Not Enough RTL Dumps", "Need at least 2 RTL dump files.")
+                    self.notify(live, QMessageBox.warning, "Not Enough RTL Dumps", "Need at least 2 RTL dump files.")
                     return
 
-                diffs = generate_rtl_pass_diffs(passes)
-                viewer = RtlPassDiffTimeline(diffs, self)
-                viewer.exec_()
+                diffs = generate_rtl_pass_diffs(passes, self.store_for(build_dir))
+                self.show_timeline(mode, RtlPassDiffTimeline, diffs, live, build_dir)
+
+            if mode == "all":
+                passes = find_unified_passes(build_dir)
+                if len(passes) < 2:
+                    self.notify(live, QMessageBox.warning, "Not Enough Dumps", "Need at least 2 dump files.")
+                    return
+
+                diffs = generate_unified_pass_diffs(passes, self.store_for(build_dir))
+                self.show_timeline(mode, UnifiedPassDiffTimeline, diffs, live, build_dir)
 
 
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to run gcc with {mode.upper()} optimizations:\n{e}")
-    def get_ordered_rtl_passes(self, base_filename):
-        pattern = os.path.join(self.temp_path, f"a-{base_filename}.c.*r.*")
-        dump_files = glob.glob(pattern)
+            self.notify(live, QMessageBox.critical, "Error", f"Failed to load {mode.upper()} optimization dumps:\n{e}")
+
+    def store_for(self, build_dir):
+        # The GIMPLE, RTL and unified timelines of one build read the same dumps
+        if self.dump_store[0] != build_dir:
+            self.dump_store = (build_dir, DumpStore())
+        return self.dump_store[1]
+
+    def show_timeline(self, mode, viewer_class, diffs, live, build_dir=None):
+        # Reuse the open timeline for this mode so rebuilds refresh it in place
+        viewer = self.timeline_viewers.get(mode)
+        remarks = load_remarks(build_dir) if build_dir else None
+        if viewer is not None and viewer.isVisible():
+            viewer.set_pass_diffs(diffs, remarks)
+        else:
+            # A closed timeline is deleted, and its render and diff caches with
+            # it; the next build of this mode opens a new one
+            viewer = viewer_class(diffs, self, remarks)
+            viewer.setAttribute(Qt.WA_DeleteOnClose)
+            viewer.destroyed.connect(lambda _=None, mode=mode, viewer=viewer: self.forget_timeline(mode, viewer))
+            self.timeline_viewers[mode] = viewer
+            viewer.show()
+        viewer.diff_workers = self.diff_workers
+        if not live:
+            viewer.raise_()
+        self.live_view = mode
+        self.timeline_dirs[mode] = build_dir
+
+        report_path = os.path.join(build_dir, PROFILE_REPORT_FILE) if build_dir else None
+        if report_path and os.path.exists(report_path):
+            with open(report_path) as f:
+                report = f.read()
+            if self.profile_window is not None:
+                self.profile_window.close()
+            window = self.profile_window = ProfileWindow(report, self)
+            window.setAttribute(Qt.WA_DeleteOnClose)
+            # The replaced window is destroyed later, after this one is current
+            window.destroyed.connect(lambda _=None, window=window: self.on_profile_window_destroyed(window))
+            # Open beside the timeline
+            window.move(viewer.frameGeometry().topRight())
+            window.show()
+
+    def forget_timeline(self, mode, viewer):
+        if self.timeline_viewers.get(mode) is viewer:
+            del self.timeline_viewers[mode]
+            self.timeline_dirs.pop(mode, None)
+
+    def show_remarks(self, remarks, live):
+        viewer = self.timeline_viewers.get("remarks")
+        if not remarks and not (viewer is not None and viewer.isVisible()):
+            self.notify(live, QMessageBox.information, "No Remarks", "gcc reported no optimization remarks.")
+            return
+        if viewer is not None and viewer.isVisible():
+            viewer.set_remarks(remarks)
+        else:
+            viewer = RemarksWindow(remarks, self)
+            viewer.line_activated.connect(self.go_to_line)
+            self.timeline_viewers["remarks"] = viewer
+            viewer.show()
+        if not live:
+            viewer.raise_()
+        self.live_view = "remarks"
+
+    def go_to_line(self, line):
+        block = self.text_edit.document().findBlockByNumber(line - 1)
+        if not block.isValid():
+            return
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(block.position())
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.ensureCursorVisible()
+        self.activateWindow()
+
+    def on_profile_window_destroyed(self, window):
+        if self.profile_window is window:
+            self.profile_window = None
+
+    def build_matrix(self):
+        source = self.text_edit.toPlainText()
+        levels = list(self.opt_group.keys())
+        signature = self.build_signature(source, "matrix", *levels)
+        last = self.last_builds.get("matrix")
+        if last is not None and last[0] == signature:
+            self.show_matrix(*last[1])
+            return
 
-        def extract_info(f):
-            match = re.search(r"\.(\d+)r\.(.+)$", f)
-            if match:
-                return int(match.group(1)), match.group(2), f
-            return -1, "", f
+        matrix_dir = self.new_build_dir()
+        level_dirs = {}
+        failed_levels = []
+
+        queue = BuildQueue(parent=self)
+        for level in levels:
+            level_dir = os.path.join(matrix_dir, level.lstrip("-"))
+            os.makedirs(level_dir)
+            level_dirs[level] = level_dir
+            cmd = ["gcc"] + self.source_args() + [level, "-fdump-tree-all", "-fdump-rtl-all"] + self.output_flags(level_dir)
+
+            def on_level_finished(returncode, output, errors, level=level):
+                if returncode != 0:
+                    failed_levels.append(level)
+            queue.submit(cmd, on_level_finished, cwd=level_dir, stdin_data=source)
+
+        def on_matrix_built(failures, output, errors):
+            # The comparison is still part of the build: it takes the build slot,
+            # so Cancel, or any newer build, stops it and drops its results
+            worker = FunctionWorker(matrix_pass_stats, level_dirs, self.diff_workers, parent=self, cancellable=True)
+            worker.result_ready.connect(lambda stats: self.on_matrix_ready(worker, signature, levels, stats, failed_levels))
+            worker.failed.connect(lambda message: self.show_matrix_error(worker, message))
+            worker.finished.connect(worker.deleteLater)
+            self.build_worker = worker
+            self.last_build_line = "comparing passes across levels"
+            self.build_ticker.start()
+            self.build_progress.show()
+            self.cancel_build_button.show()
+            self.cancel_build_action.setEnabled(True)
+            self.update_build_status()
+            worker.start()
+
+        self.start_build_queue(queue, on_matrix_built)
+
+    def on_matrix_ready(self, worker, signature, levels, stats, failed_levels):
+        if worker is not self.build_worker:
+            return  # cancelled or superseded
+        self.build_worker = None
+        self.finish_build_status("Build matrix ready.")
+        self.last_builds["matrix"] = (signature, (levels, stats, failed_levels))
+        self.show_matrix(levels, stats, failed_levels)
+
+    def show_matrix(self, levels, stats, failed_levels):
+        self.build_progress.hide()
+        self.build_status_label.setText("Build matrix ready.")
+        viewer = MatrixComparisonWindow(levels, stats, failed_levels, self)
+        viewer.setAttribute(Qt.WA_DeleteOnClose)
+        viewer.show()
+
+    def show_matrix_error(self, worker, message):
+        if worker is not self.build_worker:
+            return
+        self.build_worker = None
+        self.finish_build_status("Build matrix failed.")
+        QMessageBox.critical(self, "Error", f"Could not compare optimization levels:\n{message}")
 
-        passes = sorted([extract_info(f) for f in dump_files], key=lambda x: x[0])
-        return passes
+    def build_selected_passes(self, mode):
+        source = self.text_edit.toPlainText()
+        kind = "tree" if mode == "gimple" else "rtl"
 
-    
-    def get_ordered_gimple_passes(self, base_filename):
-        pattern = os.path.join(self.temp_path, f"a-{base_filename}.c.*t.*")
-        dump_files = glob.glob(pattern)
+        # Only the pass list, no dumps: a plain compile with -fdump-passes
+        cmd = ["gcc"] + self.source_args() + [self.optimization_level, "-fdump-passes", "-S", "-o", os.devnull]
 
-        def extract_info(f):
-            match = re.search(r"\.(\d+)t\.(.+)$", f)
-            if match:
-                return int(match.group(1)), match.group(2), f
-            return -1, "", f  # fallback
+        def on_pass_list(returncode, output, errors):
+            if returncode != 0:
+                QMessageBox.critical(self, "Build Failed", f"Errors:\n{errors}")
+                return
+
+            pass_names = [name for k, name, enabled in parse_dump_passes(errors) if k == kind and enabled]
+            if not pass_names:
+                QMessageBox.information(self, "No Passes", f"gcc reported no {mode.upper()} passes.")
+                return
+
+            picker = PassPickerDialog(pass_names, self)
+            if picker.exec_() != QDialog.Accepted:
+                return
+
+            build_dir = self.new_build_dir()
+            viewer = SelectivePassTimeline(
+                f"{mode.upper()} Pass Timeline (selected passes)", pass_names,
+                lambda names: self.fetch_pass_dumps(viewer, build_dir, source, kind, names), self
+            )
+            self.fetch_pass_dumps(viewer, build_dir, source, kind, picker.selected_passes())
+            viewer.exec_()
+
+        self.start_build(cmd, on_pass_list, cwd=self.temp_path, stdin_data=source)
+
+    def fetch_pass_dumps(self, viewer, build_dir, source, kind, names):
+        # Later fetches compile the same snapshot as the first, even if the buffer changed since
+        if not names:
+            return
+        cmd = ["gcc"] + self.source_args() + [self.optimization_level] + [f"-fdump-{kind}-{name}" for name in names]
+        cmd += self.output_flags(build_dir)
+
+        def on_finished(returncode, output, errors):
+            if returncode != 0:
+                viewer.set_fetch_failed(names, errors)
+                return
+            viewer.set_dump_files(self.find_pass_dumps(build_dir, kind), names)
+
+        self.start_build(cmd, on_finished, cwd=build_dir, stdin_data=source)
+
+    def find_pass_dumps(self, build_dir, kind):
+        if kind == "rtl":
+            passes = self.get_ordered_rtl_passes(build_dir)
+        else:
+            passes = self.get_ordered_gimple_passes(build_dir)
+        return {name: path for _, name, path in passes}
+
+    def get_ordered_passes(self, build_dir, kinds):
+        return find_ordered_passes(build_dir, kinds)
+
+    def get_ordered_rtl_passes(self, build_dir):
+        return self.get_ordered_passes(build_dir, "r")
 
-        passes = sorted([extract_info(f) for f in dump_files], key=lambda x: x[0])
-        return passes
+    def get_ordered_gimple_passes(self, build_dir):
+        return self.get_ordered_passes(build_dir, "t")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)